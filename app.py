@@ -113,8 +113,12 @@
 
 
 import os
+import time
+import json
 import requests
-from flask import Flask, jsonify, abort, render_template, request
+from collections import Counter
+from concurrent.futures import as_completed, TimeoutError as FuturesTimeoutError
+from flask import Flask, jsonify, abort, render_template, request, url_for, Response, stream_with_context, g
 from dotenv import load_dotenv
 from flask_cors import CORS # Import CORS
 
@@ -124,14 +128,50 @@ from logic import (
     fetch_user_repos,
     analyze_repo_languages,
     calculate_activity_streak,
-    fetch_pinned_repos, # Make sure this is imported
-    get_ai_summary, # The robust summarizer
-    generate_developer_summary # The AI persona
+    fetch_profile_bundle, # Concurrent page-1 fan-out
+    fetch_profile_bundles, # Bulk multi-user fetch
+    BATCH_MAX_USERS,
+    cache_get_many, # One-MGET cache reads
+    iter_all_user_repos, # Full repo pagination
+    fetch_language_bytes, # Byte-weighted language stats
+    fetch_executor, # Shared upstream fetch pool
+    submit_in_context
 )
+from jobs import submit_job, get_job, start_job_workers # Background AI summary jobs
+from metrics import HTTP_LATENCY, start_trace, server_timing_header, render_metrics # Instrumentation
+from logs import get_logger # Structured, queue-backed logging
 
 load_dotenv()
+log = get_logger("app")
+
 app = Flask(__name__)
 CORS(app) # Enable CORS for all routes
+start_job_workers() # Drain the shared AI job queue from this process
+
+JOB_STREAM_TIMEOUT = 120 # seconds an SSE job stream stays open
+DASHBOARD_STREAM_TIMEOUT = float(os.getenv('DASHBOARD_STREAM_TIMEOUT', 90)) # seconds the dashboard stream waits for its slowest section
+SERVER_TIMING = os.getenv('SERVER_TIMING', '1') == '1' # per-stage timings on every response; otherwise only with ?debug=timings
+
+
+# --- Instrumentation ---
+@app.before_request
+def start_request_trace():
+    g.request_started = time.perf_counter()
+    g.trace = start_trace()
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_started
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_LATENCY.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+    if SERVER_TIMING or request.args.get('debug') == 'timings':
+        response.headers["Server-Timing"] = server_timing_header(g.trace, elapsed)
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint for this worker process."""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route('/')
@@ -146,16 +186,18 @@ def get_user_profile(username):
     page = request.args.get('page', 1, type=int)
 
     if page == 1:
-        # For the initial load, fetch all primary data
-        user_data = fetch_github_data(username)
+        # For the initial load, fetch all primary data concurrently
+        bundle = fetch_profile_bundle(username)
+        user_data = bundle["profile"]
         if not user_data:
-            print(f"Aborting: User '{username}' not found.")
+            if "profile" in bundle["timed_out"]:
+                log.warning("Aborting: Profile fetch for '%s' timed out.", username)
+                abort(504, description=f"Timed out fetching user '{username}' from GitHub.")
+            log.warning("Aborting: User '%s' not found.", username)
             abort(404, description=f"User '{username}' not found.")
 
-        # --- THIS IS THE FIX ---
-        # Fetch pinned repos and the first page of regular repos
-        repos = fetch_user_repos(username, page=page)
-        pinned_repos = fetch_pinned_repos(username) # Call the function
+        repos = bundle["repos"]
+        pinned_repos = bundle["pinned"]
 
         # Combine both lists for a complete language analysis
         all_repos_for_analysis = (pinned_repos or []) + (repos or [])
@@ -165,7 +207,8 @@ def get_user_profile(username):
             "profile": user_data,
             "pinned_repos": pinned_repos, # Add pinned repos to the response
             "repos": repos,
-            "language_stats": language_stats.most_common(5)
+            "language_stats": language_stats.most_common(5),
+            "partial": bool(bundle["timed_out"]) # True when a slow leg was dropped
         }
     else:
         # For 'Load More' (which we removed from UI, but API logic is safe)
@@ -175,6 +218,74 @@ def get_user_profile(username):
     return jsonify(response_data)
 
 
+@app.route('/api/user/<string:username>/repos/all')
+def stream_all_user_repos(username):
+    """
+    Streams every repo of a user/org as newline-delimited JSON: one
+    {"type": "repos"} line per page as it arrives, then a {"type": "summary"}
+    line with the total count and language stats. If pages failed or were past
+    ALL_REPOS_MAX_PAGES, the summary has "partial": true and lists them in
+    "missing_pages", and its counts cover only the pages that arrived.
+    """
+    def generate():
+        language_counts = Counter()
+        total = 0
+        missing_pages = []
+        try:
+            for page, repos in iter_all_user_repos(username):
+                if repos is None: missing_pages.append(page); continue
+                language_counts.update(analyze_repo_languages(repos))
+                total += len(repos)
+                yield json.dumps({"type": "repos", "page": page, "repos": repos}) + "\n"
+        except requests.exceptions.RequestException as e:
+            log.warning("Full repo walk failed for %s: %s", username, e)
+            yield json.dumps({"type": "error", "message": f"Could not fetch repositories for '{username}'."}) + "\n"
+            return
+        summary = {"type": "summary", "total": total, "language_stats": language_counts.most_common(10), "partial": bool(missing_pages)}
+        if missing_pages: summary["missing_pages"] = sorted(missing_pages)
+        yield json.dumps(summary) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@app.route('/api/user/<string:username>/languages')
+def get_user_languages(username):
+    """Top languages by bytes of code across all of the user's non-fork repos."""
+    stats = fetch_language_bytes(username)
+    if stats is None:
+        abort(503, description="Byte-weighted language stats are unavailable (GitHub token and Redis required).")
+    return jsonify({"language_stats": stats["language_bytes"][:5], "repos_counted": stats["repos_counted"]})
+
+
+@app.route('/api/users/batch', methods=['POST'])
+def get_user_profiles_batch():
+    """Returns profile, repos, pinned repos and language stats for a list of usernames."""
+    data = request.get_json(silent=True)
+    usernames = data.get('usernames') if isinstance(data, dict) else None
+    if not isinstance(usernames, list) or not usernames or not all(isinstance(name, str) and name for name in usernames):
+        abort(400, description="Request body must contain a non-empty 'usernames' list.")
+    if len(usernames) > BATCH_MAX_USERS:
+        abort(400, description=f"At most {BATCH_MAX_USERS} usernames can be requested at once.")
+
+    results = {}
+    for username, bundle in fetch_profile_bundles(usernames).items():
+        if not bundle["profile"]:
+            if "profile" in bundle["timed_out"]:
+                results[username] = {"error": f"Timed out fetching user '{username}' from GitHub."}
+            else:
+                results[username] = {"error": f"User '{username}' not found."}
+            continue
+        language_stats = analyze_repo_languages((bundle["pinned"] or []) + (bundle["repos"] or []))
+        results[username] = {
+            "profile": bundle["profile"],
+            "pinned_repos": bundle["pinned"],
+            "repos": bundle["repos"],
+            "language_stats": language_stats.most_common(5),
+            "partial": bool(bundle["timed_out"]) # True when a slow leg was dropped
+        }
+    return jsonify({"users": results})
+
+
 @app.route('/api/user/<string:username>/activity')
 def get_user_activity(username):
     """Calculates and returns the user's longest contribution streak."""
@@ -182,48 +293,142 @@ def get_user_activity(username):
     return jsonify({"longest_streak": streak})
 
 
+def _job_response(job, result_field):
+    """Returns a finished job's result (200), or 202 with the job id to poll/stream."""
+    if job["status"] == "done":
+        return jsonify({result_field: job["result"]})
+    if job["status"] == "error":
+        log.warning("%s job error: %s", job['kind'].capitalize(), job['error'])
+        abort(500, description=job["error"])
+    return jsonify({
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": url_for('get_job_status', job_id=job["id"]),
+        "stream_url": url_for('stream_job_status', job_id=job["id"])
+    }), 202
+
+
 @app.route('/api/summarize', methods=['POST'])
 def summarize_readme_route():
     """
-    Receives owner/repo and calls the robust get_ai_summary function from logic.py.
+    Receives owner/repo and queues a README summary job. Cached summaries are
+    returned immediately; otherwise the response is 202 with a job id.
     """
     data = request.get_json()
     if not data or 'owner' not in data or 'repo' not in data:
-        print("Summarize error: Missing owner or repo in request")
+        log.warning("Summarize error: Missing owner or repo in request")
         abort(400, description="Missing 'owner' or 'repo' in request body.")
 
-    owner = data['owner']
-    repo = data['repo']
-
-    # --- THIS IS THE FIX ---
-    # Call the final, robust logic function which handles caching, retries, etc.
-    summary_result = get_ai_summary(owner, repo)
-
-    # Check if the logic function returned an error string
-    if isinstance(summary_result, str) and summary_result.startswith('Error:'):
-        print(f"Summarize error from logic: {summary_result}")
-        abort(500, description=summary_result)
-
-    # If successful, return the summary
-    return jsonify({"summary": summary_result})
+    return _job_response(submit_job("summary", data['owner'], data['repo']), "summary")
 
 
 @app.route('/api/user/<string:username>/persona')
 def get_developer_persona(username):
-    """Generates and returns an AI persona summary for the user."""
-    user_data = fetch_github_data(username)
-    if not user_data:
-         print(f"Persona error: User '{username}' not found.")
+    """Queues (or returns the cached) AI persona summary for the user."""
+    # Read every key this request touches in one MGET; the lookups below then hit the local tier.
+    cache_get_many([f"user:{username}", f"repos:{username}", f"persona:{username}"])
+    if not fetch_github_data(username):
+         log.warning("Persona error: User '%s' not found.", username)
          abort(404, description=f"User '{username}' not found for persona generation.")
 
-    repos_data = fetch_user_repos(username, page=1)
-    persona_summary = generate_developer_summary(user_data, repos_data)
+    return _job_response(submit_job("persona", username), "persona_summary")
+
+
+@app.route('/api/jobs/<string:job_id>')
+def get_job_status(job_id):
+    """Returns the status (and result, once finished) of an AI job."""
+    job = get_job(job_id)
+    if not job:
+        abort(404, description=f"Job '{job_id}' not found or expired.")
+    return jsonify({key: job.get(key) for key in ("id", "kind", "status", "result", "error")})
+
+
+def _sse(event, data):
+    """Formats one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    if isinstance(persona_summary, str) and persona_summary.startswith('Error:'):
-        print(f"Persona error from logic: {persona_summary}")
-        abort(500, description=persona_summary)
 
-    return jsonify({"persona_summary": persona_summary})
+@app.route('/api/jobs/<string:job_id>/stream')
+def stream_job_status(job_id):
+    """Streams an AI job's status as server-sent events until it finishes."""
+    def generate():
+        deadline = time.monotonic() + JOB_STREAM_TIMEOUT
+        last_status = None
+        while time.monotonic() < deadline:
+            job = get_job(job_id)
+            if not job:
+                yield _sse("error", {'error': 'Job not found or expired.'})
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield _sse("status", {key: job.get(key) for key in ("id", "kind", "status", "result", "error")})
+            if job["status"] in ("done", "error"):
+                return
+            time.sleep(0.5)
+        yield _sse("error", {'error': 'Timed out waiting for job.'})
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+
+@app.route('/api/user/<string:username>/dashboard/stream')
+def stream_dashboard(username):
+    """
+    Streams the whole dashboard over one connection as server-sent events.
+    The streak and the persona job start first; the page-1 bundle
+    (fetch_profile_bundle) is then fetched on this thread and sent as 'profile',
+    'repos', 'pinned' and 'language_stats', followed by 'activity' and 'persona'
+    once they finish within DASHBOARD_STREAM_TIMEOUT. Failed or timed-out sections
+    get a 'section_error' event; an unknown user ends the stream with a 404 one.
+    'done' closes the stream.
+    """
+    deadline = time.monotonic() + DASHBOARD_STREAM_TIMEOUT
+    # The bundle waits on fetch_executor itself, so only the streak goes there.
+    streak_future = submit_in_context(fetch_executor, calculate_activity_streak, username)
+    persona_job = submit_job("persona", username)
+
+    def generate():
+        try:
+            bundle = fetch_profile_bundle(username)
+        except Exception as e:
+            log.warning("Dashboard profile section failed for %s: %s", username, e)
+            yield _sse("section_error", {"section": "profile", "error": "Could not load profile."}); return
+        if not bundle["profile"]:
+            if "profile" in bundle["timed_out"]:
+                yield _sse("section_error", {"section": "profile", "status": 504, "error": f"Timed out fetching user '{username}' from GitHub."})
+            else:
+                log.warning("Dashboard stream: User '%s' not found.", username)
+                yield _sse("section_error", {"section": "profile", "status": 404, "error": f"User '{username}' not found."})
+            return
+        yield _sse("profile", bundle["profile"])
+        for section in ("repos", "pinned"):
+            if section in bundle["timed_out"]: yield _sse("section_error", {"section": section, "error": f"Timed out loading {section}."})
+            else: yield _sse(section, bundle[section] or [])
+        language_stats = analyze_repo_languages((bundle["pinned"] or []) + (bundle["repos"] or []))
+        yield _sse("language_stats", language_stats.most_common(5))
+
+        try:
+            yield _sse("activity", {"longest_streak": streak_future.result(timeout=max(deadline - time.monotonic(), 0))})
+        except FuturesTimeoutError:
+            log.warning("Dashboard activity section for %s exceeded %ss.", username, DASHBOARD_STREAM_TIMEOUT)
+            yield _sse("section_error", {"section": "activity", "error": "Timed out loading activity."})
+        except Exception as e:
+            log.warning("Dashboard activity section failed for %s: %s", username, e)
+            yield _sse("section_error", {"section": "activity", "error": "Could not load activity."})
+
+        job = persona_job
+        while job["status"] not in ("done", "error") and time.monotonic() < deadline:
+            time.sleep(0.5)
+            job = get_job(job["id"]) or {"status": "error", "error": "Job not found or expired."}
+        if job["status"] == "done":
+            yield _sse("persona", {"persona_summary": job["result"]})
+        elif job["status"] == "error":
+            yield _sse("section_error", {"section": "persona", "error": job["error"]})
+        else:
+            yield _sse("section_error", {"section": "persona", "error": "Timed out generating persona."})
+        yield _sse("done", {})
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 if __name__ == '__main__':
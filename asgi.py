@@ -0,0 +1,362 @@
+import os
+import re
+import json
+import time
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+import redis.asyncio as aioredis
+from asgiref.wsgi import WsgiToAsgi
+from dotenv import load_dotenv
+
+load_dotenv() # before importing logic, so tokens and REDIS_URL are visible to it
+
+from logic import (
+    redis_client,
+    local_cache,
+    rate_limiter,
+    github_tokens,
+    slim_profile,
+    slim_repos,
+    analyze_repo_languages,
+    calculate_activity_streak,
+    encode_cache_entry,
+    unpack_cache_entry,
+    schedule_refresh,
+    format_graphql_repo,
+    decode_validator,
+    validator_headers,
+    encode_validator,
+    profiles_graphql_payload,
+    parse_profiles_graphql,
+    graphql_bundle_entries,
+    prefetch_readme_summaries,
+    profile_refreshers,
+    user_entry_loader,
+    PINNED_REPOS_QUERY,
+    GITHUB_API_URL,
+    GITHUB_GRAPHQL_URL,
+    PROFILE_FETCH_DEADLINE,
+    GRAPHQL_PROFILE_FETCH,
+    VALIDATOR_CACHE_DURATION,
+    CACHE_DURATION,
+    PINNED_CACHE_DURATION,
+    NOT_FOUND_CACHE_DURATION,
+    RATE_LIMIT_WINDOW,
+    LOCAL_CACHE_MAX_TTL
+)
+from app import app as flask_app # every route not served here is delegated to Flask
+from jobs import submit_job
+from metrics import UPSTREAM_LATENCY, REDIS_LATENCY, HTTP_LATENCY, timed
+from logs import get_logger
+
+log = get_logger("asgi")
+
+# --- Async Mode Settings ---
+# Run with: uvicorn asgi:application --workers 2
+# The four hot routes below run on the event loop, so a worker can hold thousands of
+# in-flight GitHub waits; everything else runs through Flask in asgiref's thread pool.
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', 200))
+ASYNC_HTTP_KEEPALIVE = int(os.getenv('ASYNC_HTTP_KEEPALIVE', 50))
+
+http_client = None # httpx.AsyncClient, created on lifespan startup inside the event loop
+aio_redis = None
+flask_asgi = WsgiToAsgi(flask_app)
+
+
+# --- Async Redis Cache (same {v, t, s} entries as logic.cache_get/cache_set) ---
+async def acache_get_many(cache_keys, refreshers=None):
+    """
+    Local tier first, then one async MGET; misses are omitted from the result.
+    Stale entries with a loader in refreshers ({cache_key: loader}) are served and
+    reloaded on logic's background refresh pool, as cache_get_many does.
+    """
+    refreshers = refreshers or {}
+    values, missing = {}, []
+    for cache_key in cache_keys:
+        if (value := local_cache.get(cache_key)) is not None: values[cache_key] = value
+        else: missing.append(cache_key)
+    if missing and aio_redis:
+        with timed(REDIS_LATENCY, "redis", command="mget"): cached_values = await aio_redis.mget(missing)
+        invalid = []
+        for cache_key, cached_data in zip(missing, cached_values):
+            value, state = unpack_cache_entry(cache_key, cached_data)
+            if value is not None: values[cache_key] = value
+            if state == "invalid": invalid.append(cache_key)
+            elif state == "stale" and (refresh := refreshers.get(cache_key)):
+                # schedule_refresh claims its marker with a blocking SET NX; keep that off the loop.
+                asyncio.get_running_loop().run_in_executor(None, schedule_refresh, cache_key, refresh)
+        if invalid: await aio_redis.delete(*invalid)
+    return values
+
+async def acache_set_many(items):
+    """Writes {cache_key: (value, ttl)} to the local tier and in one async pipeline."""
+    for cache_key, (value, ttl) in items.items():
+        local_cache.set(cache_key, value, min(ttl, LOCAL_CACHE_MAX_TTL))
+    if not aio_redis or not items: return
+    pipe = aio_redis.pipeline(transaction=False)
+    for cache_key, (value, ttl) in items.items(): pipe.setex(cache_key, *encode_cache_entry(value, ttl))
+    with timed(REDIS_LATENCY, "redis", command="pipeline_setex"): await pipe.execute()
+
+_inflight = {}
+
+async def acoalesced(cache_key, loader):
+    """Shares one running loader() per cache_key between concurrent requests on this loop."""
+    if (task := _inflight.get(cache_key)) is None:
+        task = asyncio.ensure_future(loader())
+        _inflight[cache_key] = task
+        task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+    return await asyncio.shield(task) # a caller's deadline must not cancel the shared load
+
+
+# --- Async GitHub Client ---
+async def agithub_request(method, url, resource="core", headers=None, **kwargs):
+    """Async github_request: same token pool and rate-limit budget, non-blocking I/O."""
+    tokens = github_tokens() or [None]
+    if aio_redis:
+        pipe = aio_redis.pipeline(transaction=False)
+        for token in tokens: pipe.hgetall(rate_limiter.state_key(resource, token))
+        raw_states = await pipe.execute()
+    else:
+        raw_states = [{}] * len(tokens)
+    token, remaining, reset = max(rate_limiter.parse_states(resource, tokens, raw_states), key=lambda state: state[1])
+    if (wait_for := rate_limiter.wait_before_call(resource, remaining, reset)) is not None:
+        await asyncio.sleep(wait_for)
+    elif aio_redis:
+        pipe = aio_redis.pipeline(transaction=False)
+        pipe.hincrby(rate_limiter.state_key(resource, token), "in_flight", 1)
+        if not reset: pipe.expire(rate_limiter.state_key(resource, token), RATE_LIMIT_WINDOW) # as RateLimitGovernor.acquire
+        await pipe.execute()
+
+    request_headers = dict(headers or {})
+    if token: request_headers["Authorization"] = f"{'bearer' if resource == 'graphql' else 'token'} {token}"
+    service = "github_graphql" if resource == "graphql" else "github_rest"
+    with timed(UPSTREAM_LATENCY, service, service=service, status="error") as labels:
+        response = await http_client.request(method, url, headers=request_headers, **kwargs)
+        labels["status"] = response.status_code
+
+    if aio_redis and (recorded := rate_limiter.recorded_state(resource, token, response.headers)):
+        state_key, fields, expire_at = recorded
+        pipe = aio_redis.pipeline(transaction=False)
+        pipe.hset(state_key, mapping=fields)
+        pipe.expireat(state_key, expire_at)
+        await pipe.execute()
+    return response
+
+async def _aconditional_github_get(cache_key, api_url, ttl, project):
+    """Async _conditional_github_get: revalidates with the stored ETag/Last-Modified and serves a 304 from the stored body."""
+    validator_key = f"etag:{cache_key}"
+    stored = None
+    if aio_redis and (cached_validator := await aio_redis.get(validator_key)):
+        if (stored := decode_validator(cached_validator)) is None: await aio_redis.delete(validator_key)
+
+    response = await agithub_request("GET", api_url, headers=validator_headers(stored), timeout=10)
+    if response.status_code == 304 and stored:
+        log.debug("Revalidated %s with 304 Not Modified", cache_key)
+        await acache_set_many({cache_key: (stored["data"], ttl)})
+        await aio_redis.expire(validator_key, VALIDATOR_CACHE_DURATION)
+        return stored["data"]
+    response.raise_for_status()
+
+    data = project(response.json())
+    await acache_set_many({cache_key: (data, ttl)})
+    if aio_redis and (validator := encode_validator(response.headers, data)) is not None:
+        await aio_redis.setex(validator_key, VALIDATOR_CACHE_DURATION, validator)
+    return data
+
+async def _aload_profile_graphql(username):
+    """Async fetch_profile_graphql: one combined query, cached under user:/repos:/pinned:; None to fall back to REST."""
+    try:
+        response = await agithub_request("POST", GITHUB_GRAPHQL_URL, resource="graphql", json=profiles_graphql_payload([username]), timeout=15)
+        response.raise_for_status()
+        raw_data = response.json()
+    except (httpx.HTTPError, json.JSONDecodeError) as e: log.warning("Error combined GraphQL profile for %s: %s", username, e); return None
+    found, not_found = parse_profiles_graphql([username], raw_data)
+    if username in not_found:
+        await _aremember_missing_user(username)
+        return {"profile": None, "repos": [], "pinned": []}
+    if (bundle := found.get(username)) is None: return None
+    await acache_set_many(graphql_bundle_entries(username, bundle))
+    prefetch_readme_summaries(bundle["pinned"]) # returns at once; its Redis claims run on logic's refresh pool
+    return bundle
+
+async def _aload_profile(username):
+    try:
+        return await _aconditional_github_get(f"user:{username}", f"{GITHUB_API_URL}/users/{username}", CACHE_DURATION, slim_profile)
+    except httpx.HTTPError as e:
+        if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 404: await _aremember_missing_user(username)
+        log.warning("Error user data for %s: %s", username, e); return None
+
+async def _aremember_missing_user(username):
+    """Async remember_missing_user: a missing:{username} entry with no stale window."""
+    local_cache.set(f"missing:{username}", True, min(NOT_FOUND_CACHE_DURATION, LOCAL_CACHE_MAX_TTL))
+    if aio_redis: await aio_redis.setex(f"missing:{username}", *encode_cache_entry(True, NOT_FOUND_CACHE_DURATION, stale=False))
+
+async def _aload_repos(username):
+    api_url = f"{GITHUB_API_URL}/users/{username}/repos?sort=pushed&per_page=30&page=1"
+    try: return await _aconditional_github_get(f"repos:{username}", api_url, CACHE_DURATION, slim_repos)
+    except httpx.HTTPError as e: log.warning("Error repos page 1 for %s: %s", username, e); return []
+
+async def _aload_pinned(username):
+    if not github_tokens(): return []
+    try:
+        response = await agithub_request("POST", GITHUB_GRAPHQL_URL, resource="graphql",
+                                         json={"query": PINNED_REPOS_QUERY, "variables": {"username": username}}, timeout=15)
+        response.raise_for_status()
+        raw_data = response.json()
+    except (httpx.HTTPError, json.JSONDecodeError) as e: log.warning("Error calling GraphQL API for %s: %s", username, e); return []
+    if "errors" in raw_data: log.warning("GraphQL API returned errors for %s: %s", username, raw_data["errors"]); return []
+    nodes = ((raw_data.get("data") or {}).get("repositoryOwner") or {}).get("pinnedItems", {}).get("nodes") or []
+    pinned = [format_graphql_repo(repo) for repo in nodes if repo and isinstance(repo, dict)]
+    await acache_set_many({f"pinned:{username}": (pinned, PINNED_CACHE_DURATION)})
+    prefetch_readme_summaries(pinned) # returns at once; its Redis claims run on logic's refresh pool
+    return pinned
+
+async def afetch_profile_bundle(username, deadline=PROFILE_FETCH_DEADLINE):
+    """
+    Async fetch_profile_bundle: one MGET, then the combined GraphQL query (within
+    half the deadline), then the legs it didn't fill concurrently under the rest.
+    """
+    started = time.monotonic()
+    legs = {"profile": (f"user:{username}", _aload_profile), "repos": (f"repos:{username}", _aload_repos), "pinned": (f"pinned:{username}", _aload_pinned)}
+    cached = await acache_get_many([key for key, _ in legs.values()] + [f"missing:{username}"], refreshers=profile_refreshers(username))
+    if f"missing:{username}" in cached and not all(key in cached for key, _ in legs.values()):
+        return {"profile": None, "repos": [], "pinned": [], "timed_out": []}
+    bundle = {"timed_out": []}
+    for name, (key, _) in legs.items():
+        if key in cached: bundle[name] = cached[key]
+    if len(bundle) == len(legs) + 1: return bundle
+
+    if GRAPHQL_PROFILE_FETCH and aio_redis and github_tokens():
+        graphql_deadline = deadline / 2
+        try:
+            combined = await asyncio.wait_for(acoalesced(f"profile:{username}", lambda: _aload_profile_graphql(username)), graphql_deadline)
+            if combined: bundle.update(combined); return bundle
+        except asyncio.TimeoutError: log.warning("Combined GraphQL profile for %s exceeded the %ss deadline.", username, graphql_deadline)
+        except Exception as e: log.error("Unexpected error in combined GraphQL profile for %s: %s", username, e)
+    deadline = max(deadline - (time.monotonic() - started), 0)
+
+    tasks = {}
+    for name, (key, loader) in legs.items():
+        if name not in bundle: tasks[name] = asyncio.ensure_future(acoalesced(key, lambda loader=loader: loader(username)))
+    if tasks: await asyncio.wait(tasks.values(), timeout=deadline)
+
+    defaults = {"profile": None, "repos": [], "pinned": []}
+    for name, task in tasks.items():
+        if not task.done():
+            log.warning("Deadline of %ss exceeded for %s of %s. Returning partial results.", deadline, name, username)
+            task.cancel(); bundle["timed_out"].append(name); bundle[name] = defaults[name]
+        elif task.exception():
+            log.error("Unexpected error fetching %s for %s: %s", name, username, task.exception())
+            bundle[name] = defaults[name]
+        else:
+            bundle[name] = task.result()
+    return bundle
+
+
+# --- Routes ---
+def _job_body(job, result_field):
+    if job["status"] == "done": return 200, {result_field: job["result"]}
+    if job["status"] == "error": return 500, {"error": job["error"]}
+    return 202, {"job_id": job["id"], "status": job["status"],
+                 "status_url": f"/api/jobs/{job['id']}", "stream_url": f"/api/jobs/{job['id']}/stream"}
+
+async def get_user_profile(username, query, body):
+    bundle = await afetch_profile_bundle(username)
+    if not bundle["profile"]:
+        if "profile" in bundle["timed_out"]: return 504, {"error": f"Timed out fetching user '{username}' from GitHub."}
+        return 404, {"error": f"User '{username}' not found."}
+    language_stats = analyze_repo_languages((bundle["pinned"] or []) + (bundle["repos"] or []))
+    return 200, {
+        "profile": bundle["profile"],
+        "pinned_repos": bundle["pinned"],
+        "repos": bundle["repos"],
+        "language_stats": language_stats.most_common(5),
+        "partial": bool(bundle["timed_out"])
+    }
+
+async def get_user_activity(username, query, body):
+    cached = await acache_get_many([f"streak:{username}"], refreshers={f"streak:{username}": user_entry_loader("streak", username)})
+    if (streak := cached.get(f"streak:{username}")) is not None: return 200, {"longest_streak": int(streak)}
+    # The incremental day index is maintained with several dependent Redis steps; run it off the loop.
+    return 200, {"longest_streak": await asyncio.to_thread(calculate_activity_streak, username)}
+
+async def summarize_readme_route(query, body):
+    data = json.loads(body) if body else None
+    if not isinstance(data, dict) or 'owner' not in data or 'repo' not in data:
+        return 400, {"error": "Missing 'owner' or 'repo' in request body."}
+    cached = await acache_get_many([f"summary:{data['owner']}/{data['repo']}"])
+    if (summary := cached.get(f"summary:{data['owner']}/{data['repo']}")) is not None: return 200, {"summary": summary}
+    return _job_body(await asyncio.to_thread(submit_job, "summary", data['owner'], data['repo']), "summary")
+
+async def get_developer_persona(username, query, body):
+    cached = await acache_get_many([f"user:{username}", f"persona:{username}"])
+    profile = cached.get(f"user:{username}")
+    if profile is None: profile = await acoalesced(f"user:{username}", lambda: _aload_profile(username))
+    if not profile: return 404, {"error": f"User '{username}' not found for persona generation."}
+    if (persona := cached.get(f"persona:{username}")) is not None: return 200, {"persona_summary": persona}
+    return _job_body(await asyncio.to_thread(submit_job, "persona", username), "persona_summary")
+
+ROUTES = [
+    ("GET", re.compile(r"^/api/user/(?P<username>[^/]+)/activity$"), "/api/user/<string:username>/activity", get_user_activity),
+    ("GET", re.compile(r"^/api/user/(?P<username>[^/]+)/persona$"), "/api/user/<string:username>/persona", get_developer_persona),
+    ("POST", re.compile(r"^/api/summarize$"), "/api/summarize", summarize_readme_route),
+    ("GET", re.compile(r"^/api/user/(?P<username>[^/]+)$"), "/api/user/<string:username>", get_user_profile),
+]
+
+def _match(scope):
+    for method, pattern, rule, handler in ROUTES:
+        if scope["method"] == method and (match := pattern.match(scope["path"])):
+            query = parse_qs(scope.get("query_string", b"").decode())
+            # Only page 1 of the profile route is async; 'Load More' pages go to Flask.
+            if handler is get_user_profile and query.get("page", ["1"])[0] != "1": return None
+            return rule, handler, match.groupdict(), query
+    return None
+
+
+# --- ASGI Application ---
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"): return body
+
+async def _lifespan(receive, send):
+    global http_client, aio_redis
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            http_client = httpx.AsyncClient(limits=httpx.Limits(max_connections=ASYNC_HTTP_MAX_CONNECTIONS, max_keepalive_connections=ASYNC_HTTP_KEEPALIVE))
+            if redis_client: # only when the sync client could connect at import
+                aio_redis = aioredis.from_url(os.getenv('REDIS_URL')) if os.getenv('REDIS_URL') else aioredis.Redis(host='localhost', port=6379, db=0)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await http_client.aclose()
+            if aio_redis: await aio_redis.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan": return await _lifespan(receive, send)
+    if scope["type"] != "http" or not (matched := _match(scope)):
+        return await flask_asgi(scope, receive, send)
+
+    rule, handler, path_args, query = matched
+    started = time.perf_counter()
+    body = await _read_body(receive) if scope["method"] == "POST" else None
+    try:
+        status, payload = await handler(**path_args, query=query, body=body)
+    except json.JSONDecodeError:
+        status, payload = 400, {"error": "Request body must be JSON."}
+    except Exception as e:
+        log.error("Unhandled error serving %s: %s", scope["path"], e)
+        status, payload = 500, {"error": "Internal server error."}
+
+    content = json.dumps(payload).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode()),
+                            (b"access-control-allow-origin", b"*")]})
+    await send({"type": "http.response.body", "body": content})
+    HTTP_LATENCY.observe(time.perf_counter() - started, endpoint=rule, method=scope["method"], status=status)
@@ -0,0 +1,285 @@
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from fixtures import build_corpus
+
+# --- Fake GitHub REST/GraphQL + Gemini Server ---
+# Serves the fixture corpus with the response shapes, pagination Link headers, ETags
+# and X-RateLimit-* headers the app relies on. Latency, error rate and rate-limit
+# budget are configurable so load scenarios can model slow or failing upstreams.
+# Point the app at it with GITHUB_API_URL=http://host:port and
+# GEMINI_API_URL=http://host:port/gemini:generateContent.
+
+def _user_id(login):
+    return int(hashlib.sha1(login.encode()).hexdigest()[:7], 16)
+
+class FakeUpstream:
+    def __init__(self, corpus, latency_ms=40, jitter_ms=20, gemini_latency_ms=800, error_rate=0.0,
+                 rate_limit=5000, rate_window=3600, seed=None):
+        self.users = {user["login"].lower(): user for user in corpus["users"]}
+        self.latency_ms, self.jitter_ms, self.gemini_latency_ms = latency_ms, jitter_ms, gemini_latency_ms
+        self.error_rate, self.rate_limit, self.rate_window = error_rate, rate_limit, rate_window
+        self.base_url = ""
+        self._random = random.Random(seed)
+        self._budgets = {} # (token, resource) -> [remaining, reset epoch]
+        self._lock = threading.Lock()
+        self.calls = {} # "METHOD /route" -> count, for checking what a scenario cost upstream
+
+    # --- Simulation knobs ---
+    def delay(self, base_ms):
+        time.sleep(max(base_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000)
+
+    def should_fail(self):
+        return self.error_rate and self._random.random() < self.error_rate
+
+    def spend(self, token, resource):
+        """Returns (allowed, rate-limit headers) for one call against token's budget."""
+        with self._lock:
+            remaining, reset = self._budgets.get((token, resource), (self.rate_limit, 0))
+            if reset <= time.time(): remaining, reset = self.rate_limit, int(time.time()) + self.rate_window
+            allowed = remaining > 0
+            if allowed: remaining -= 1
+            self._budgets[(token, resource)] = (remaining, reset)
+        return allowed, {"X-RateLimit-Limit": str(self.rate_limit), "X-RateLimit-Remaining": str(remaining),
+                         "X-RateLimit-Reset": str(reset), "X-RateLimit-Resource": resource}
+
+    def count(self, route):
+        with self._lock: self.calls[route] = self.calls.get(route, 0) + 1
+
+    # --- Response shapes ---
+    def rest_profile(self, user):
+        return {
+            "login": user["login"], "id": _user_id(user["login"]), "type": "User",
+            "name": user["name"], "bio": user["bio"], "company": None, "location": None, "blog": "",
+            "twitter_username": None, "avatar_url": f"{self.base_url}/avatars/{user['login']}.png",
+            "html_url": f"https://github.com/{user['login']}", "followers": user["followers"],
+            "following": user["following"], "public_repos": len(user["repos"]), "created_at": user["created_at"],
+        }
+
+    def rest_repo(self, user, repo):
+        return {
+            "name": repo["name"], "full_name": f"{user['login']}/{repo['name']}", "description": repo["description"],
+            "html_url": f"https://github.com/{user['login']}/{repo['name']}", "language": repo["language"],
+            "topics": repo["topics"], "stargazers_count": repo["stargazers_count"], "forks_count": repo["forks_count"],
+            "fork": repo["fork"], "pushed_at": repo["pushed_at"], "created_at": repo["created_at"],
+            "updated_at": repo["pushed_at"], "owner": {"login": user["login"]},
+            "private": False, "size": sum(repo["languages"].values()) // 1024, "default_branch": "main",
+        }
+
+    def graphql_repo(self, user, repo):
+        return {
+            "name": repo["name"], "description": repo["description"], "stargazerCount": repo["stargazers_count"],
+            "forkCount": repo["forks_count"], "url": f"https://github.com/{user['login']}/{repo['name']}",
+            "owner": {"login": user["login"]}, "primaryLanguage": {"name": repo["language"]},
+            "repositoryTopics": {"nodes": [{"topic": {"name": topic}} for topic in repo["topics"]]},
+            "nameWithOwner": f"{user['login']}/{repo['name']}", "isFork": repo["fork"],
+            "pushedAt": repo["pushed_at"], "createdAt": repo["created_at"], "updatedAt": repo["pushed_at"],
+        }
+
+    def repos_by_push(self, user):
+        return sorted(user["repos"], key=lambda repo: repo["pushed_at"], reverse=True)
+
+    def pinned(self, user):
+        by_name = {repo["name"]: repo for repo in user["repos"]}
+        return [self.graphql_repo(user, by_name[name]) for name in user["pinned"] if name in by_name]
+
+    def readme(self, user, repo):
+        return (f"# {repo['name']}\n\n{repo['description']}.\n\n## Features\n\n"
+                + "".join(f"- {topic} support\n" for topic in repo["topics"])
+                + f"\n## Stack\n\nWritten in {', '.join(repo['languages'])}.\n")
+
+    def graphql(self, query, variables):
+        """Answers the three query shapes the app sends: pinned items, batched users, repo languages."""
+        data, errors = {}, []
+        if "UserFields" in query:
+            for alias, login in variables.items():
+                if not (user := self.users.get(login.lower())):
+                    data[alias] = None; errors.append({"type": "NOT_FOUND", "path": [alias]}); continue
+                data[alias] = {
+                    "__typename": "User", "login": user["login"], "databaseId": _user_id(user["login"]), "name": user["name"],
+                    "bio": user["bio"], "company": None, "location": None, "websiteUrl": None, "twitterUsername": None,
+                    "avatarUrl": f"{self.base_url}/avatars/{user['login']}.png", "url": f"https://github.com/{user['login']}",
+                    "createdAt": user["created_at"], "followers": {"totalCount": user["followers"]},
+                    "following": {"totalCount": user["following"]}, "repositories": {"totalCount": len(user["repos"])},
+                    "recentRepos": {"nodes": [self.graphql_repo(user, repo) for repo in self.repos_by_push(user)[:30]]},
+                    "pinnedItems": {"nodes": self.pinned(user)},
+                }
+        elif "repositoryOwner" in query:
+            user = self.users.get(variables.get("username", "").lower())
+            data["repositoryOwner"] = {"pinnedItems": {"nodes": self.pinned(user)}} if user else None
+        elif "languages(" in query:
+            for i in range(len(variables) // 2):
+                user = self.users.get(variables[f"o{i}"].lower())
+                repo = next((repo for repo in (user or {}).get("repos", []) if repo["name"] == variables[f"n{i}"]), None)
+                if not repo:
+                    data[f"r{i}"] = None; errors.append({"type": "NOT_FOUND", "path": [f"r{i}"]}); continue
+                edges = sorted(repo["languages"].items(), key=lambda item: -item[1])
+                data[f"r{i}"] = {"languages": {"edges": [{"size": size, "node": {"name": name}} for name, size in edges]}}
+        else:
+            errors.append({"message": "Unsupported query for the fake upstream"})
+        return {"data": data, "errors": errors} if errors else {"data": data}
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, like the real APIs
+    upstream = None # set by serve()
+
+    def log_message(self, format, *args): pass
+
+    def send_body(self, status, body, headers=None, content_type="application/json"):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items(): self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_json_with_etag(self, body, headers):
+        payload = json.dumps(body).encode("utf-8")
+        etag = '"' + hashlib.sha1(payload).hexdigest()[:20] + '"'
+        if self.headers.get("If-None-Match") == etag: # like GitHub, 304s don't spend the budget
+            return self.send_body(304, b"", {"ETag": etag})
+        self.send_body(200, payload, {**headers, "ETag": etag})
+
+    def github_call(self, resource):
+        """Applies latency, errors and the rate-limit budget; returns headers or None if already answered."""
+        upstream = self.upstream
+        upstream.delay(upstream.latency_ms)
+        if upstream.should_fail():
+            self.send_body(502, {"message": "Server Error"}); return None
+        token = (self.headers.get("Authorization") or "anonymous").split(" ")[-1]
+        allowed, headers = upstream.spend(token, resource)
+        if not allowed:
+            self.send_body(403, {"message": "API rate limit exceeded"}, headers); return None
+        return headers
+
+    def do_GET(self):
+        upstream = self.upstream
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if len(parts) == 4 and parts[0] == "raw": # raw README downloads aren't rate limited
+            upstream.count("GET /raw"); upstream.delay(upstream.latency_ms)
+            user = upstream.users.get(parts[1].lower())
+            repo = next((repo for repo in (user or {}).get("repos", []) if repo["name"] == parts[2]), None)
+            if not repo: return self.send_body(404, {"message": "Not Found"})
+            return self.send_body(200, upstream.readme(user, repo).encode("utf-8"), content_type="text/plain; charset=utf-8")
+
+        if parts and parts[0] == "users":
+            route = "GET /users/" + "/".join(["{u}"] + parts[2:])
+            upstream.count(route)
+            if (headers := self.github_call("core")) is None: return
+            user = upstream.users.get(parts[1].lower()) if len(parts) > 1 else None
+            if not user: return self.send_body(404, {"message": "Not Found"}, headers)
+            if len(parts) == 2: return self.send_json_with_etag(upstream.rest_profile(user), headers)
+            per_page = min(int(query.get("per_page", 30)), 100)
+            page = max(int(query.get("page", 1)), 1)
+            if parts[2] == "repos":
+                items = [upstream.rest_repo(user, repo) for repo in upstream.repos_by_push(user)]
+            elif parts[2] == "events":
+                items = user["events"]
+            else:
+                return self.send_body(404, {"message": "Not Found"}, headers)
+            last_page = max((len(items) + per_page - 1) // per_page, 1)
+            if page < last_page:
+                link = f"{upstream.base_url}{url.path}?per_page={per_page}&page={{}}"
+                headers["Link"] = f'<{link.format(page + 1)}>; rel="next", <{link.format(last_page)}>; rel="last"'
+            return self.send_json_with_etag(items[(page - 1) * per_page:page * per_page], headers)
+
+        if len(parts) == 4 and parts[0] == "repos" and parts[3] == "readme":
+            upstream.count("GET /repos/{o}/{r}/readme")
+            if (headers := self.github_call("core")) is None: return
+            user = upstream.users.get(parts[1].lower())
+            repo = next((repo for repo in (user or {}).get("repos", []) if repo["name"] == parts[2]), None)
+            if not repo: return self.send_body(404, {"message": "Not Found"}, headers)
+            content = upstream.readme(user, repo).encode("utf-8")
+            sha = hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+            if "application/vnd.github.raw" in (self.headers.get("Accept") or ""): # raw media type: the body itself
+                if self.headers.get("If-None-Match") == f'"{sha}"': return self.send_body(304, b"", {"ETag": f'"{sha}"'})
+                return self.send_body(200, content, {**headers, "ETag": f'"{sha}"'}, content_type="text/plain; charset=utf-8")
+            return self.send_json_with_etag({
+                "name": "README.md", "path": "README.md", "size": len(content),
+                "sha": sha,
+                "download_url": f"{upstream.base_url}/raw/{user['login']}/{repo['name']}/README.md",
+            }, headers)
+
+        self.send_body(404, {"message": "Not Found"})
+
+    def do_POST(self):
+        upstream = self.upstream
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        path = urlparse(self.path).path
+
+        if path == "/graphql":
+            upstream.count("POST /graphql")
+            if (headers := self.github_call("graphql")) is None: return
+            return self.send_body(200, upstream.graphql(body.get("query", ""), body.get("variables") or {}), headers)
+
+        if path.endswith(":generateContent"):
+            upstream.count("POST gemini")
+            upstream.delay(upstream.gemini_latency_ms)
+            if upstream.should_fail(): return self.send_body(503, {"error": {"message": "overloaded"}})
+            prompt = body["contents"][0]["parts"][0]["text"]
+            if (body.get("generationConfig") or {}).get("responseMimeType") == "application/json": # batched READMEs
+                sections = re.findall(r"^--- README (\S+) ---\n(.*?)(?=^--- README |\Z)", prompt, re.M | re.S)
+                replies = {readme_id: f"* Summary {hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]}: a project described in {len(text)} characters."
+                           for readme_id, text in sections}
+                text = json.dumps(replies)
+            else:
+                digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+                text = f"* Summary {digest}: a project described in {len(prompt)} characters of prompt."
+            return self.send_body(200, {"candidates": [{"content": {"parts": [{"text": text}]}, "finishReason": "STOP"}]})
+
+        self.send_body(404, {"error": {"message": "Not Found"}})
+
+
+def serve(upstream, host="127.0.0.1", port=0):
+    """Starts the fake upstream on a daemon thread; returns (server, base_url)."""
+    handler = type("BoundFakeUpstreamHandler", (FakeUpstreamHandler,), {"upstream": upstream})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    upstream.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="fake-upstream", daemon=True).start()
+    return server, upstream.base_url
+
+def load_corpus(fixtures_path=None, seed=7):
+    if not fixtures_path: return build_corpus(seed)
+    with open(fixtures_path) as fixture_file: return json.load(fixture_file)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake GitHub REST/GraphQL and Gemini API for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="JSON corpus (default: generated from fixtures.py)")
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--gemini-latency-ms", type=float, default=800)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=5000, help="calls per token per window and resource")
+    parser.add_argument("--rate-window", type=int, default=3600)
+    args = parser.parse_args()
+
+    upstream = FakeUpstream(load_corpus(args.fixtures), latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                            gemini_latency_ms=args.gemini_latency_ms, error_rate=args.error_rate,
+                            rate_limit=args.rate_limit, rate_window=args.rate_window)
+    server, base_url = serve(upstream, args.host, args.port)
+    print(f"Fake upstream on {base_url}")
+    print(f"  GITHUB_API_URL={base_url}")
+    print(f"  GEMINI_API_URL={base_url}/gemini:generateContent")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+
+# --- Fixture Corpus ---
+# A deterministic stand-in for recorded GitHub data: profiles, repos (with language
+# byte breakdowns) and public events for a spread of account sizes, from empty
+# accounts to ones that need several 100-repo pages. Run this module to dump the
+# corpus as JSON, e.g. to edit it or replace it with real recorded responses, and
+# pass the file to fake_upstream.py with --fixtures.
+REPO_COUNTS = (0, 3, 8, 15, 30, 45, 60, 90, 120, 150, 210, 260)
+LANGUAGES = ("Python", "JavaScript", "TypeScript", "Go", "Rust", "Java", "C++", "Shell", "HTML", "CSS")
+EVENT_TYPES = ("PushEvent", "PushEvent", "PushEvent", "CreateEvent", "PullRequestEvent", "IssuesEvent", "WatchEvent", "ForkEvent")
+TOPICS = ("cli", "web", "api", "machine-learning", "devtools", "database", "security", "game", "docs", "infra")
+RECORDED_AT = datetime(2025, 6, 1)
+
+def build_corpus(seed=7):
+    """Returns {"recorded_at", "users": [...]}; the same seed always yields the same corpus."""
+    rng = random.Random(seed)
+    users = []
+    for i, repo_count in enumerate(REPO_COUNTS):
+        login = f"bench-user-{i:02d}"
+        created = RECORDED_AT - timedelta(days=rng.randint(400, 4000))
+        repos = []
+        for r in range(repo_count):
+            primary = rng.choice(LANGUAGES)
+            languages = {primary: rng.randint(2_000, 900_000)}
+            for extra in rng.sample(LANGUAGES, rng.randint(0, 3)):
+                languages.setdefault(extra, rng.randint(100, 120_000))
+            pushed = RECORDED_AT - timedelta(days=rng.randint(0, 900), minutes=rng.randint(0, 1440))
+            repos.append({
+                "name": f"project-{r:03d}",
+                "description": f"{primary} {rng.choice(TOPICS)} project number {r}",
+                "language": primary,
+                "languages": languages,
+                "topics": rng.sample(TOPICS, rng.randint(0, 4)),
+                "stargazers_count": int(rng.paretovariate(1.2)) - 1,
+                "forks_count": int(rng.paretovariate(1.6)) - 1,
+                "fork": rng.random() < 0.15,
+                "pushed_at": pushed.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "created_at": (pushed - timedelta(days=rng.randint(0, 700))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            })
+        events = []
+        active_days = sorted(rng.sample(range(0, 90), min(90, rng.randint(0, 60))))
+        for day in active_days:
+            for _ in range(rng.randint(1, 5)):
+                events.append({"type": rng.choice(EVENT_TYPES), "created_at": (RECORDED_AT - timedelta(days=day, minutes=rng.randint(0, 1440))).strftime("%Y-%m-%dT%H:%M:%SZ")})
+        events = sorted(events, key=lambda event: event["created_at"], reverse=True)[:300]
+        for n, event in enumerate(events): event["id"] = str(900_000 + i * 1000 + len(events) - n)
+        users.append({
+            "login": login,
+            "name": f"Bench User {i:02d}",
+            "bio": f"Synthetic profile with {repo_count} repositories",
+            "followers": int(rng.paretovariate(0.9)),
+            "following": rng.randint(0, 200),
+            "created_at": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "pinned": [repo["name"] for repo in sorted(repos, key=lambda repo: -repo["stargazers_count"])[:6]],
+            "repos": repos,
+            "events": events,
+        })
+    return {"recorded_at": RECORDED_AT.strftime("%Y-%m-%d"), "users": users}
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes the fixture corpus as JSON.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="benchmarks/fixtures.json")
+    args = parser.parse_args()
+    corpus = build_corpus(args.seed)
+    with open(args.out, "w") as fixture_file:
+        fixture_file.write('{"recorded_at": %s, "users": [\n' % json.dumps(corpus["recorded_at"]))
+        fixture_file.write(",\n".join(json.dumps(user, separators=(",", ":")) for user in corpus["users"]))
+        fixture_file.write("\n]}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from fake_upstream import FakeUpstream, serve, load_corpus
+
+# --- Load Scenarios ---
+# Runs every app endpoint against the fake upstream and reports latency percentiles
+# and throughput for a cold cache (first request per target after a flush) and a
+# warm cache (repeated requests). Job endpoints are timed until the job finishes.
+#
+#   python benchmarks/run.py --fake-redis
+#   python benchmarks/run.py --redis-url redis://localhost:6379/15 --json bench.json
+#   python benchmarks/run.py --baseline bench.json --max-regression 0.25
+#
+# The Redis database given is FLUSHED before each scenario; never point it at a shared one.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    # name: (method, path, json body, result field of a job endpoint)
+    "profile": ("GET", "/api/user/{user}", None, None),
+    "activity": ("GET", "/api/user/{user}/activity", None, None),
+    "dashboard": ("GET", "/api/user/{user}/dashboard/stream", None, None),
+    "repos_all": ("GET", "/api/user/{user}/repos/all", None, None),
+    "languages": ("GET", "/api/user/{user}/languages", None, None),
+    "persona": ("GET", "/api/user/{user}/persona", None, "persona_summary"),
+    "summarize": ("POST", "/api/summarize", {"owner": "{user}", "repo": "{repo}"}, "summary"),
+    "batch": ("POST", "/api/users/batch", {"usernames": "{all_users}"}, None),
+    "missing_user": ("GET", "/api/user/bench-no-such-user", None, None),
+}
+EXPECTED_STATUS = {"missing_user": 404}
+JOB_POLL_INTERVAL = 0.05
+JOB_TIMEOUT = 60
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values: return None
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+def summarize_latencies(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered), "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 1) if ordered else None,
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 1) if ordered else None,
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 1) if ordered else None,
+        "rps": round(len(ordered) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+class LoadRunner:
+    def __init__(self, base_url, targets, concurrency):
+        self.base_url, self.targets, self.concurrency = base_url, targets, concurrency
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, "session"): self._local.session = requests.Session()
+        return self._local.session
+
+    def _fill(self, value, target):
+        if isinstance(value, str):
+            if value == "{all_users}": return [user for user, _ in self.targets]
+            return value.format(user=target[0], repo=target[1])
+        if isinstance(value, dict): return {key: self._fill(item, target) for key, item in value.items()}
+        return value
+
+    def one(self, name, target):
+        """Runs one scenario request (and its job, if any); returns (seconds, ok)."""
+        method, path, body, job_field = SCENARIOS[name]
+        session = self._session()
+        started = time.perf_counter()
+        response = session.request(method, self.base_url + self._fill(path, target), json=self._fill(body, target), timeout=120)
+        response.content # drain streamed bodies
+        ok = response.status_code == EXPECTED_STATUS.get(name, 200)
+        if job_field and response.status_code == 202:
+            job_url = self.base_url + response.json()["status_url"]
+            deadline = started + JOB_TIMEOUT
+            while time.perf_counter() < deadline:
+                job = session.get(job_url, timeout=10).json()
+                if job["status"] in ("done", "error"): break
+                time.sleep(JOB_POLL_INTERVAL)
+            ok = job["status"] == "done"
+        return time.perf_counter() - started, ok
+
+    def phase(self, name, count):
+        """Issues count requests spread over the targets with the configured concurrency."""
+        targets = [self.targets[i % len(self.targets)] for i in range(count)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(lambda target: self.one(name, target), targets))
+        elapsed = time.perf_counter() - started
+        return summarize_latencies([seconds for seconds, _ in results], sum(1 for _, ok in results if not ok), elapsed)
+
+
+# --- App Under Test ---
+def start_app(args, upstream_url):
+    """Configures the app for the fake upstream, imports it and serves it on a local port."""
+    os.environ.update({
+        "GITHUB_API_URL": upstream_url,
+        "GEMINI_API_URL": f"{upstream_url}/gemini:generateContent",
+        "GITHUB_TOKEN": os.environ.get("BENCH_GITHUB_TOKEN", "bench-token"),
+        "GEMINI_API_KEY": "bench-key",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        # Prefetched README summaries would keep running into later phases (and across flushdb),
+        # charging their upstream calls to whichever scenario happens to be measured.
+        "SUMMARY_PREFETCH": os.environ.get("SUMMARY_PREFETCH", "0"),
+    })
+    os.environ.pop("GITHUB_TOKENS", None)
+    if args.redis_url: os.environ["REDIS_URL"] = args.redis_url
+    sys.path.insert(0, REPO_ROOT)
+
+    import logic
+    if args.fake_redis:
+        import fakeredis
+        logic.redis_client = fakeredis.FakeRedis() # before jobs/app import it by name
+    if not logic.redis_client: sys.exit("Benchmarks need Redis: pass --redis-url or --fake-redis.")
+
+    if args.server == "asgi":
+        import uvicorn
+        import asgi
+        config = uvicorn.Config(asgi.application, host="127.0.0.1", port=args.app_port, log_level="warning", lifespan="on")
+        server = uvicorn.Server(config)
+        threading.Thread(target=server.run, name="bench-app", daemon=True).start()
+        while not server.started: time.sleep(0.05)
+        port = server.servers[0].sockets[0].getsockname()[1]
+    else:
+        import logging
+        from werkzeug.serving import make_server
+        import app
+        logging.getLogger("werkzeug").setLevel(logging.WARNING) # no access log line per request
+        server = make_server("127.0.0.1", args.app_port, app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, name="bench-app", daemon=True).start()
+        port = server.server_port
+    return logic, f"http://127.0.0.1:{port}"
+
+def reset_caches(logic):
+    logic.redis_client.flushdb()
+    logic.local_cache.clear()
+
+
+# --- Reporting ---
+def print_report(results):
+    header = f"{'scenario':<14}{'phase':<6}{'reqs':>6}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'upstream':>10}"
+    print(header); print("-" * len(header))
+    for name, phases in results.items():
+        for phase in ("cold", "warm"):
+            stats = phases[phase]
+            print(f"{name:<14}{phase:<6}{stats['requests']:>6}{stats['errors']:>6}{stats['p50_ms']!s:>10}{stats['p95_ms']!s:>10}"
+                  f"{stats['p99_ms']!s:>10}{stats['rps']!s:>9}{stats['upstream_calls']:>10}")
+
+def regressions(results, baseline, max_regression):
+    """Lists scenario/phase pairs whose p95 grew by more than max_regression over the baseline."""
+    found = []
+    for name, phases in results.items():
+        for phase, stats in phases.items():
+            previous = baseline.get(name, {}).get(phase, {}).get("p95_ms")
+            if previous and stats["p95_ms"] and stats["p95_ms"] > previous * (1 + max_regression):
+                found.append(f"{name}/{phase}: p95 {stats['p95_ms']}ms vs baseline {previous}ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmarks against a fake GitHub and Gemini.")
+    parser.add_argument("--scenarios", nargs="*", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="warm requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi")
+    parser.add_argument("--app-port", type=int, default=0)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15", help="database that gets FLUSHED between scenarios")
+    parser.add_argument("--fake-redis", action="store_true", help="use in-process fakeredis instead of a Redis server")
+    parser.add_argument("--fixtures", help="JSON corpus for the fake upstream")
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--gemini-latency-ms", type=float, default=800)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--json", help="write results to this file (usable as a later --baseline)")
+    parser.add_argument("--baseline", help="results JSON to compare p95 latencies against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed p95 growth over the baseline")
+    args = parser.parse_args()
+    if args.fake_redis and args.server == "asgi": parser.error("--fake-redis only works with --server wsgi")
+
+    corpus = load_corpus(args.fixtures)
+    upstream = FakeUpstream(corpus, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, gemini_latency_ms=args.gemini_latency_ms,
+                            error_rate=args.error_rate, rate_limit=args.rate_limit, seed=1)
+    _, upstream_url = serve(upstream)
+    logic, app_url = start_app(args, upstream_url)
+
+    targets = [(user["login"], user["repos"][0]["name"]) for user in corpus["users"] if user["repos"]]
+    runner = LoadRunner(app_url, targets, args.concurrency)
+    results = {}
+    for name in args.scenarios:
+        reset_caches(logic)
+        calls_before = sum(upstream.calls.values())
+        cold = runner.phase(name, len(targets))
+        cold["upstream_calls"] = sum(upstream.calls.values()) - calls_before
+        calls_before = sum(upstream.calls.values())
+        warm = runner.phase(name, args.requests)
+        warm["upstream_calls"] = sum(upstream.calls.values()) - calls_before
+        results[name] = {"cold": cold, "warm": warm}
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as results_file: json.dump(results, results_file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file: found = regressions(results, json.load(baseline_file), args.max_regression)
+        for line in found: print(f"REGRESSION {line}")
+        if found: sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import os
+import time
+import uuid
+import threading
+import redis
+
+from logic import (
+    redis_client,
+    cache_codec,
+    cache_get,
+    fetch_github_data,
+    fetch_user_repos,
+    get_ai_summary,
+    generate_developer_summary
+)
+from logs import get_logger
+
+log = get_logger("jobs")
+
+# --- Job Queue Settings ---
+JOB_QUEUE_KEY = "jobs:queue"
+JOB_PROCESSING_KEY = "jobs:processing" # jobs a worker has taken but not finished
+JOB_TTL = int(os.getenv('JOB_TTL', 3600)) # 1 hour to collect a finished job's result
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4)) # local worker threads per process
+JOB_POLL_TIMEOUT = 5 # seconds a worker blocks on the queue before checking again
+JOB_HEARTBEAT_INTERVAL = 10 # seconds between a running job's heartbeats
+JOB_LEASE = int(os.getenv('JOB_LEASE', 60)) # a running job without a heartbeat for this long is requeued
+JOB_TAKE_GRACE = 5 # seconds a taken, still 'queued' job may go without a lease before it counts as stalled
+
+
+# --- Job Kinds ---
+def _run_summary(owner, repo):
+    return get_ai_summary(owner, repo)
+
+def _run_persona(username):
+    user_data = fetch_github_data(username)
+    if not user_data:
+        return f"Error: User '{username}' not found for persona generation."
+    return generate_developer_summary(user_data, fetch_user_repos(username, page=1))
+
+# kind -> (cache key builder, runner). The cache key doubles as the dedupe key.
+JOB_KINDS = {
+    "summary": (lambda owner, repo: f"summary:{owner}/{repo}", _run_summary),
+    "persona": (lambda username: f"persona:{username}", _run_persona),
+}
+
+
+# --- Job Records ---
+def _save_job(job):
+    redis_client.setex(f"job:{job['id']}", JOB_TTL, cache_codec.encode(job))
+
+def get_job(job_id):
+    """Returns the stored job dict, or None if it is unknown or expired."""
+    if not redis_client or not job_id: return None
+    if stored := redis_client.get(f"job:{job_id}"):
+        try: return cache_codec.decode(stored)
+        except ValueError: log.warning("Discarding undecodable job record %s", job_id)
+    return None
+
+
+# --- Submitting Jobs ---
+def submit_job(kind, *args):
+    """
+    Queues a summary/persona job and returns its record. Results that are already
+    cached come back immediately with status 'done', and a job already queued or
+    running for the same cache key is returned instead of queueing a duplicate.
+    """
+    cache_key_for, run = JOB_KINDS[kind]
+    if not redis_client:
+        return {"id": None, "kind": kind, "status": "error", "error": "Error: Redis connection not available."}
+
+    cache_key = cache_key_for(*args)
+    if cache_get(cache_key) is not None:
+        return {"id": None, "kind": kind, "status": "done", "result": run(*args)}
+
+    job_id = uuid.uuid4().hex
+    dedupe_key = f"jobkey:{cache_key}"
+    if not redis_client.set(dedupe_key, job_id, nx=True, ex=JOB_TTL):
+        existing_id = redis_client.get(dedupe_key)
+        if existing_id and (existing_job := get_job(existing_id.decode())):
+            return existing_job
+        redis_client.set(dedupe_key, job_id, ex=JOB_TTL) # pointer outlived its job record
+
+    job = {"id": job_id, "kind": kind, "args": list(args), "cache_key": cache_key, "status": "queued", "created_at": time.time()}
+    _save_job(job)
+    redis_client.lpush(JOB_QUEUE_KEY, job_id)
+    return job
+
+
+# --- Workers ---
+# Workers move each job from the queue onto a processing list and hold a
+# 'jobbeat:{id}' lease on it, renewed every JOB_HEARTBEAT_INTERVAL while it runs. A job
+# whose worker died (e.g. killed on deploy) loses its lease, and any worker then moves
+# it back onto the queue. BLMOVE and the first lease write are two commands, so a taken
+# job still marked 'queued' is only requeued once it has gone JOB_TAKE_GRACE unleased.
+def _heartbeat(job_id, stopped):
+    while not stopped.wait(JOB_HEARTBEAT_INTERVAL):
+        redis_client.set(f"jobbeat:{job_id}", 1, ex=JOB_LEASE)
+
+def _process_job(job_id):
+    redis_client.set(f"jobbeat:{job_id}", 1, ex=JOB_LEASE) # first, to keep the unleased window short
+    job = get_job(job_id)
+    if not job:
+        log.warning("Skipping expired or unknown job %s", job_id)
+        redis_client.delete(f"jobbeat:{job_id}")
+        redis_client.lrem(JOB_PROCESSING_KEY, 1, job_id)
+        return
+    _, run = JOB_KINDS[job["kind"]]
+    job["status"] = "running"; _save_job(job)
+    stopped = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job_id, stopped), name=f"gitglance-job-heartbeat-{job_id[:8]}", daemon=True).start()
+    try:
+        result = run(*job["args"])
+        if isinstance(result, str) and result.startswith('Error:'):
+            job.update(status="error", error=result)
+        else:
+            job.update(status="done", result=result)
+    except Exception as e:
+        log.error("Unexpected error running %s job %s: %s", job['kind'], job_id, e)
+        job.update(status="error", error=f"Error: {job['kind']} job failed unexpectedly.")
+    finally:
+        stopped.set()
+        job["finished_at"] = time.time()
+        _save_job(job)
+        redis_client.delete(f"jobkey:{job['cache_key']}", f"jobbeat:{job_id}", f"jobseen:{job_id}")
+        redis_client.lrem(JOB_PROCESSING_KEY, 1, job_id)
+
+def requeue_stalled_jobs():
+    """Moves taken jobs whose worker lease has lapsed back onto the queue; returns how many."""
+    requeued = 0
+    for raw_id in redis_client.lrange(JOB_PROCESSING_KEY, 0, -1):
+        job_id = raw_id.decode()
+        job = get_job(job_id)
+        if not job or job["status"] in ("done", "error"): # finished (or expired) but never removed
+            redis_client.lrem(JOB_PROCESSING_KEY, 1, job_id); continue
+        if redis_client.exists(f"jobbeat:{job_id}"): continue
+        if job["status"] == "queued" and not _unleased_for(job_id, JOB_TAKE_GRACE): continue # may be between BLMOVE and its lease
+        if redis_client.lrem(JOB_PROCESSING_KEY, 1, job_id): # only one worker wins the requeue
+            log.warning("Requeueing %s job %s after its worker stopped heartbeating", job['kind'], job_id)
+            job["status"] = "queued"; _save_job(job)
+            redis_client.delete(f"jobseen:{job_id}")
+            redis_client.rpush(JOB_QUEUE_KEY, job_id) # next in line
+            requeued += 1
+    return requeued
+
+def _unleased_for(job_id, seconds):
+    """True once a taken job has been seen without a lease for at least seconds; the first sighting starts the clock."""
+    seen_key = f"jobseen:{job_id}"
+    now = time.time()
+    if redis_client.set(seen_key, now, nx=True, ex=JOB_LEASE * 2): return False
+    first_seen = redis_client.get(seen_key)
+    return first_seen is not None and now - float(first_seen) >= seconds
+
+def _worker_loop():
+    next_reap = 0
+    while True:
+        try:
+            if time.monotonic() >= next_reap:
+                requeue_stalled_jobs(); next_reap = time.monotonic() + JOB_LEASE / 2
+            job_id = redis_client.blmove(JOB_QUEUE_KEY, JOB_PROCESSING_KEY, JOB_POLL_TIMEOUT, "RIGHT", "LEFT")
+        except redis.exceptions.RedisError as e:
+            log.warning("Job worker could not read the queue: %s", e)
+            time.sleep(JOB_POLL_TIMEOUT)
+            continue
+        if job_id:
+            _process_job(job_id.decode())
+
+_workers_started = False
+_workers_lock = threading.Lock()
+
+def start_job_workers(count=JOB_WORKERS):
+    """Starts this process's pool of daemon worker threads (once)."""
+    global _workers_started
+    if not redis_client: return
+    with _workers_lock:
+        if _workers_started: return
+        for i in range(count):
+            threading.Thread(target=_worker_loop, name=f"gitglance-job-{i}", daemon=True).start()
+        _workers_started = True
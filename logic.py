@@ -1,37 +1,510 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import redis
 import json
 import time 
-from collections import Counter
-from datetime import datetime, timedelta
+import threading
+import zlib
+import hashlib
+import codecs
+import contextvars
+from contextlib import contextmanager
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, TimeoutError as FuturesTimeoutError
+from datetime import datetime, date
+from urllib.parse import urlparse, parse_qs
+from metrics import CACHE_REQUESTS, UPSTREAM_LATENCY, UPSTREAM_RETRIES, REDIS_LATENCY, timed
+from logs import get_logger, SAMPLED
+
+try:
+    import msgpack # Optional: more compact and faster than JSON for cached repo lists
+except ImportError:
+    msgpack = None
+
+log = get_logger("logic")
 
 # --- Redis Connection (PRODUCTION-READY) ---
 try:
     # Look for the production REDIS_URL first (this will be set by Render)
     redis_url = os.getenv('REDIS_URL')
     if redis_url:
-        print("Connecting to cloud Redis...")
-        redis_client = redis.Redis.from_url(redis_url, decode_responses=True)
+        log.info("Connecting to cloud Redis...")
+        redis_client = redis.Redis.from_url(redis_url)
     else:
         # Fallback to localhost for local development
-        print("REDIS_URL not found. Connecting to localhost...")
-        redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+        log.info("REDIS_URL not found. Connecting to localhost...")
+        redis_client = redis.Redis(host='localhost', port=6379, db=0)
     
     redis_client.ping()
-    print("Successfully connected to Redis.") 
+    log.info("Successfully connected to Redis.")
 except redis.exceptions.ConnectionError as e:
     # This error will now catch both local and cloud connection failures
-    print(f"CRITICAL ERROR: Could not connect to Redis. {e}")
-    print("Please ensure Redis is running (local or cloud).")
+    log.critical("Could not connect to Redis. %s", e)
+    log.critical("Please ensure Redis is running (local or cloud).")
     redis_client = None 
     
 # --- Cache Durations ---
 CACHE_DURATION = 600 # 10 minutes for standard profile/repo cache
 SUMMARY_CACHE_DURATION = 86400 # 24 hours for AI summaries
+SUMMARY_CONTENT_CACHE_DURATION = int(os.getenv('SUMMARY_CONTENT_CACHE_DURATION', 2592000)) # 30 days for summaries keyed by README content
 STREAK_CACHE_DURATION = 3600 # 1 hour for streak
 PINNED_CACHE_DURATION = 3600 # 1 hour for pinned repos
 PERSONA_CACHE_DURATION = 86400 # 24 hours for AI persona
+VALIDATOR_CACHE_DURATION = int(os.getenv('VALIDATOR_CACHE_DURATION', 604800)) # 7 days for ETag/Last-Modified revalidation data
+
+# --- Concurrent Fetch Pool ---
+FETCH_POOL_SIZE = int(os.getenv('FETCH_POOL_SIZE', 16))
+PROFILE_FETCH_DEADLINE = float(os.getenv('PROFILE_FETCH_DEADLINE', 12)) # seconds for the whole page-1 fan-out
+GRAPHQL_PROFILE_FETCH = os.getenv('GRAPHQL_PROFILE_FETCH', '1') == '1' # one GraphQL call instead of the REST trio
+NOT_FOUND_CACHE_DURATION = int(os.getenv('NOT_FOUND_CACHE_DURATION', 60)) # seconds an unknown login is remembered
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_POOL_SIZE, thread_name_prefix="gitglance-fetch")
+
+def submit_in_context(executor, fn, *args):
+    """Submits fn to executor under a copy of the caller's context (request trace, priority)."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+# --- Shared HTTP Session (pooled keep-alive connections) ---
+GITHUB_POOL_MAXSIZE = int(os.getenv('GITHUB_POOL_MAXSIZE', FETCH_POOL_SIZE)) # connections kept per GitHub host
+GEMINI_POOL_MAXSIZE = int(os.getenv('GEMINI_POOL_MAXSIZE', 8)) # connections kept to the Gemini API
+DEFAULT_POOL_MAXSIZE = int(os.getenv('DEFAULT_POOL_MAXSIZE', 4)) # any other host (e.g. README download URLs)
+
+# --- Upstream Endpoints (overridable, e.g. to point at benchmarks/fake_upstream.py) ---
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+GITHUB_GRAPHQL_URL = f"{GITHUB_API_URL}/graphql"
+GEMINI_API_URL = os.getenv('GEMINI_API_URL', 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent')
+
+def _origin(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+def _build_http_session():
+    """
+    Builds one requests.Session shared by every fetcher, with a dedicated
+    connection pool per upstream host so TCP+TLS handshakes are reused.
+    """
+    session = requests.Session()
+    session.headers.update({"User-Agent": "git-glance", "Connection": "keep-alive"})
+    default_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=DEFAULT_POOL_MAXSIZE)
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+    session.mount(GITHUB_API_URL, HTTPAdapter(pool_connections=1, pool_maxsize=GITHUB_POOL_MAXSIZE))
+    session.mount("https://raw.githubusercontent.com", HTTPAdapter(pool_connections=1, pool_maxsize=GITHUB_POOL_MAXSIZE))
+    session.mount(_origin(GEMINI_API_URL), HTTPAdapter(pool_connections=1, pool_maxsize=GEMINI_POOL_MAXSIZE))
+    return session
+
+http_session = _build_http_session()
+
+# --- GitHub Rate-Limit Governor ---
+# Remaining budget per token is tracked in Redis (shared by all workers) for the
+# REST 'core' and 'graphql' resources separately, from GitHub's X-RateLimit-*
+# headers. Interactive loads may spend down to RATE_LIMIT_INTERACTIVE_RESERVE;
+# background work (stale refreshes, warming) stops at RATE_LIMIT_BACKGROUND_RESERVE
+# so it never starves page loads.
+RATE_LIMIT_INTERACTIVE_RESERVE = int(os.getenv('RATE_LIMIT_INTERACTIVE_RESERVE', 10))
+RATE_LIMIT_BACKGROUND_RESERVE = int(os.getenv('RATE_LIMIT_BACKGROUND_RESERVE', 500))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', 5)) # longest an interactive call sleeps for a reset
+RATE_LIMIT_DEFAULTS = {"core": 5000, "graphql": 5000, "anonymous": 60}
+RATE_LIMIT_WINDOW = 3600 # GitHub's budget window; bounds how long an in-flight count without recorded headers lives
+
+request_priority = contextvars.ContextVar("request_priority", default="interactive")
+
+@contextmanager
+def priority(level):
+    """Runs the enclosed GitHub calls at 'interactive' or 'background' priority."""
+    reset_token = request_priority.set(level)
+    try: yield
+    finally: request_priority.reset(reset_token)
+
+class GitHubRateLimited(requests.exceptions.RequestException):
+    """Raised instead of calling GitHub when no token has budget left for this priority."""
+
+def github_tokens():
+    """The token pool: comma-separated GITHUB_TOKENS, else the single GITHUB_TOKEN."""
+    tokens = os.getenv("GITHUB_TOKENS") or os.getenv("GITHUB_TOKEN") or ""
+    return [token.strip() for token in tokens.split(",") if token.strip()]
+
+class RateLimitGovernor:
+    """Picks the least-used token per request and throttles before GitHub's limit is hit."""
+
+    # state_key/parse_states/wait_before_call/recorded_state do no I/O, so asgi.py's
+    # async client reuses them around its own Redis calls.
+    def state_key(self, resource, token):
+        """Redis hash holding one token's remaining budget and reset epoch for a resource."""
+        fingerprint = hashlib.sha1(token.encode()).hexdigest()[:12] if token else "anonymous"
+        return f"ratelimit:{resource}:{fingerprint}"
+
+    def _states(self, resource, tokens):
+        """Returns [(token, remaining, reset_epoch)]; tokens without recorded state count as unused."""
+        if not redis_client: return self.parse_states(resource, tokens, [{}] * len(tokens))
+        pipe = redis_client.pipeline(transaction=False)
+        for token in tokens: pipe.hgetall(self.state_key(resource, token))
+        return self.parse_states(resource, tokens, pipe.execute())
+
+    def parse_states(self, resource, tokens, raw_states):
+        """
+        Turns the HGETALL results for tokens into [(token, remaining, reset_epoch)]:
+        the last recorded budget (or the default before any is recorded) minus the
+        calls acquired since then.
+        """
+        default = RATE_LIMIT_DEFAULTS[resource] if tokens[0] else RATE_LIMIT_DEFAULTS["anonymous"]
+        states = []
+        for token, state in zip(tokens, raw_states):
+            reset = int(state.get(b"reset", 0))
+            recorded = int(state[b"remaining"]) if b"remaining" in state and reset > time.time() else default
+            states.append((token, recorded - int(state.get(b"in_flight", 0)), reset))
+        return states
+
+    def wait_before_call(self, resource, remaining, reset):
+        """None while above the reserve, else seconds to wait for the reset; raises GitHubRateLimited instead of a long wait."""
+        reserve = RATE_LIMIT_BACKGROUND_RESERVE if request_priority.get() == "background" else RATE_LIMIT_INTERACTIVE_RESERVE
+        if remaining > reserve: return None
+        wait_for = reset - time.time()
+        if request_priority.get() == "background" or wait_for > RATE_LIMIT_MAX_WAIT:
+            raise GitHubRateLimited(f"GitHub {resource} budget exhausted for {request_priority.get()} requests; resets in {int(wait_for)}s.")
+        return max(wait_for, 0)
+
+    def acquire(self, resource):
+        """Returns the token to use (None for anonymous calls) or raises GitHubRateLimited."""
+        tokens = github_tokens() or [None]
+        token, remaining, reset = max(self._states(resource, tokens), key=lambda state: state[1])
+        if (wait_for := self.wait_before_call(resource, remaining, reset)) is not None:
+            time.sleep(wait_for)
+        elif redis_client:
+            # Count the call as in flight so concurrent workers spread across tokens.
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.hincrby(self.state_key(resource, token), "in_flight", 1)
+            if not reset: pipe.expire(self.state_key(resource, token), RATE_LIMIT_WINDOW) # no headers recorded yet, so no expireat either
+            pipe.execute()
+        return token
+
+    def recorded_state(self, resource, token, headers):
+        """
+        Returns (state key, fields to HSET, epoch to EXPIREAT) from GitHub's rate-limit
+        headers, or None if absent. GitHub's count covers every finished call, so the
+        in-flight count starts over.
+        """
+        remaining, reset = headers.get("X-RateLimit-Remaining"), headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None: return None
+        resource = headers.get("X-RateLimit-Resource", resource)
+        if resource not in RATE_LIMIT_DEFAULTS: return None
+        return self.state_key(resource, token), {"remaining": remaining, "reset": reset, "in_flight": 0}, int(reset) + 60
+
+    def record(self, resource, token, response):
+        """Stores the budget GitHub reports in the response headers for this token."""
+        if not redis_client or not (recorded := self.recorded_state(resource, token, response.headers)): return
+        state_key, fields, expire_at = recorded
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(state_key, mapping=fields)
+        pipe.expireat(state_key, expire_at)
+        pipe.execute()
+
+rate_limiter = RateLimitGovernor()
+
+def github_request(method, url, resource="core", headers=None, **kwargs):
+    """Sends one GitHub API request with a governed token from the pool and records its rate-limit headers."""
+    token = rate_limiter.acquire(resource)
+    request_headers = dict(headers or {})
+    if token: request_headers["Authorization"] = f"{'bearer' if resource == 'graphql' else 'token'} {token}"
+    service = "github_graphql" if resource == "graphql" else "github_rest"
+    with timed(UPSTREAM_LATENCY, service, service=service, status="error") as labels:
+        response = http_session.request(method, url, headers=request_headers, **kwargs)
+        labels["status"] = response.status_code
+    rate_limiter.record(resource, token, response)
+    return response
+
+def gemini_post(gemini_api_url, payload):
+    """POSTs one generateContent request to Gemini, recording its latency."""
+    with timed(UPSTREAM_LATENCY, "gemini", service="gemini", status="error") as labels:
+        response = http_session.post(gemini_api_url, json=payload, timeout=25)
+        labels["status"] = response.status_code
+    return response
+
+# --- Cache Codec (versioned, compressed Redis values) ---
+CACHE_SERIALIZER = os.getenv('CACHE_SERIALIZER', 'msgpack' if msgpack else 'json')
+CACHE_COMPRESS_THRESHOLD = int(os.getenv('CACHE_COMPRESS_THRESHOLD', 512)) # bytes; smaller bodies aren't worth compressing
+
+class CacheCodec:
+    """
+    Encodes cache values as a 2-byte header (serializer id, flags) followed by the
+    serialized body, zlib-compressed once it reaches compress_threshold bytes.
+    Decoding dispatches on the header, so entries written by a worker configured
+    with another serializer still read correctly.
+    """
+    FLAG_ZLIB = 0x01
+    SERIALIZERS = {
+        "json": (1, lambda value: json.dumps(value, separators=(",", ":")).encode("utf-8"), json.loads),
+    }
+    if msgpack:
+        SERIALIZERS["msgpack"] = (2, lambda value: msgpack.packb(value, use_bin_type=True), lambda body: msgpack.unpackb(body, raw=False))
+
+    def __init__(self, serializer="json", compress_threshold=512, level=6):
+        if serializer not in self.SERIALIZERS:
+            log.warning("Cache serializer '%s' unavailable. Falling back to json.", serializer)
+            serializer = "json"
+        self.format_id, self._dumps, _ = self.SERIALIZERS[serializer]
+        self._loads_by_id = {format_id: loads for format_id, _, loads in self.SERIALIZERS.values()}
+        self.compress_threshold = compress_threshold
+        self.level = level
+
+    def encode(self, value):
+        body = self._dumps(value)
+        flags = 0
+        if len(body) >= self.compress_threshold:
+            body = zlib.compress(body, self.level)
+            flags |= self.FLAG_ZLIB
+        return bytes((self.format_id, flags)) + body
+
+    def decode(self, data):
+        if len(data) < 2 or data[0] not in self._loads_by_id:
+            raise ValueError("Unrecognized cache value encoding")
+        body = data[2:]
+        if data[1] & self.FLAG_ZLIB: body = zlib.decompress(body)
+        return self._loads_by_id[data[0]](body)
+
+cache_codec = CacheCodec(CACHE_SERIALIZER, CACHE_COMPRESS_THRESHOLD)
+
+# --- In-Process Cache Tier (LRU + TTL in front of Redis) ---
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', 2048))
+LOCAL_CACHE_MAX_TTL = int(os.getenv('LOCAL_CACHE_MAX_TTL', 60)) # bounds how stale a worker can be vs. Redis
+
+# --- Stale-While-Revalidate ---
+# Each *_CACHE_DURATION is an entry's soft TTL; Redis keeps it until the hard TTL
+# (soft * STALE_TTL_MULTIPLIER, but at most STALE_TTL_MAX past the soft TTL), serving
+# it stale while a background refresh runs.
+STALE_TTL_MULTIPLIER = float(os.getenv('STALE_TTL_MULTIPLIER', 6))
+STALE_TTL_MAX = int(os.getenv('STALE_TTL_MAX', 86400)) # caps the stale window of long-lived families (summaries, language bytes)
+REFRESH_POOL_SIZE = int(os.getenv('REFRESH_POOL_SIZE', 4))
+REFRESH_LOCK_TIMEOUT = 120 # seconds a worker owns a key's background refresh
+refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_POOL_SIZE, thread_name_prefix="gitglance-refresh")
+
+class LocalCache:
+    """Thread-safe, size-bounded LRU of decoded values with per-entry expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        if ttl <= 0 or self.max_entries <= 0: return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+local_cache = LocalCache(LOCAL_CACHE_MAX_ENTRIES)
+
+def cache_get(cache_key, refresh=None):
+    """
+    Returns the decoded value for cache_key from memory or Redis, or None on a miss.
+    Past its soft TTL the stale value is still returned, and if a refresh loader is
+    given it is scheduled in the background to repopulate the entry.
+    """
+    if (value := local_cache.get(cache_key)) is not None:
+        _count_cache_lookup(cache_key, "local_hit"); return value
+    if not redis_client: return None
+    with timed(REDIS_LATENCY, "redis", command="get"): cached_data = redis_client.get(cache_key)
+    return decode_cache_entry(cache_key, cached_data, refresh)
+
+def cache_get_many(cache_keys, refreshers=None):
+    """
+    Like cache_get for several keys; local-tier misses are read with a single MGET
+    and misses are omitted from the result. refreshers maps keys to their
+    background refresh loaders for stale entries.
+    """
+    refreshers = refreshers or {}
+    values, missing = {}, []
+    for cache_key in cache_keys:
+        if (value := local_cache.get(cache_key)) is not None:
+            values[cache_key] = value; _count_cache_lookup(cache_key, "local_hit")
+        else: missing.append(cache_key)
+    if missing and redis_client:
+        with timed(REDIS_LATENCY, "redis", command="mget"): cached_values = redis_client.mget(missing)
+        for cache_key, cached_data in zip(missing, cached_values):
+            if (value := decode_cache_entry(cache_key, cached_data, refreshers.get(cache_key))) is not None:
+                values[cache_key] = value
+    return values
+
+def cache_set_many(items):
+    """Writes {cache_key: (value, ttl)} like cache_set, sending every SETEX in one pipeline."""
+    pipe = redis_client.pipeline(transaction=False) if redis_client else None
+    for cache_key, (value, ttl) in items.items():
+        local_cache.set(cache_key, value, min(ttl, LOCAL_CACHE_MAX_TTL))
+        if pipe is not None: pipe.setex(cache_key, *encode_cache_entry(value, ttl))
+    if pipe is not None:
+        with timed(REDIS_LATENCY, "redis", command="pipeline_setex"): pipe.execute()
+
+def _count_cache_lookup(cache_key, result):
+    CACHE_REQUESTS.inc(family=cache_key.split(":", 1)[0], result=result)
+
+def unpack_cache_entry(cache_key, cached_data):
+    """
+    Unwraps a raw Redis value without any Redis I/O, promoting fresh entries to the
+    local tier. Returns (value, state) with state 'miss', 'fresh', 'stale' or
+    'invalid' (undecodable; the caller should delete it).
+    """
+    if cached_data is None:
+        _count_cache_lookup(cache_key, "miss"); return None, "miss"
+    try: entry = cache_codec.decode(cached_data)
+    except (ValueError, zlib.error): entry = None
+    if not (isinstance(entry, dict) and "v" in entry and "t" in entry and "s" in entry):
+        log.warning("Discarding undecodable cache entry %s", cache_key)
+        _count_cache_lookup(cache_key, "miss"); return None, "invalid"
+
+    fresh_for = entry["t"] + entry["s"] - time.time()
+    _count_cache_lookup(cache_key, "hit" if fresh_for > 0 else "stale")
+    if fresh_for > 0:
+        local_cache.set(cache_key, entry["v"], min(fresh_for, LOCAL_CACHE_MAX_TTL))
+        return entry["v"], "fresh"
+    return entry["v"], "stale"
+
+def decode_cache_entry(cache_key, cached_data, refresh=None):
+    """Unwraps a raw Redis value, promoting fresh entries to the local tier and refreshing stale ones."""
+    value, state = unpack_cache_entry(cache_key, cached_data)
+    if state == "invalid": redis_client.delete(cache_key)
+    elif state == "stale" and refresh: schedule_refresh(cache_key, refresh)
+    return value
+
+def cache_freshness(cache_keys):
+    """Returns {cache_key: (seconds until soft expiry, soft TTL)} from one MGET; missing keys map to None."""
+    if not redis_client or not cache_keys: return {cache_key: None for cache_key in cache_keys}
+    freshness = {}
+    for cache_key, cached_data in zip(cache_keys, redis_client.mget(cache_keys)):
+        try: entry = cache_codec.decode(cached_data) if cached_data is not None else None
+        except (ValueError, zlib.error): entry = None
+        valid = isinstance(entry, dict) and "t" in entry and "s" in entry
+        freshness[cache_key] = (entry["t"] + entry["s"] - time.time(), entry["s"]) if valid else None
+    return freshness
+
+def cache_set(cache_key, value, ttl):
+    """Writes value with a soft TTL of ttl seconds; Redis keeps it until the hard TTL."""
+    local_cache.set(cache_key, value, min(ttl, LOCAL_CACHE_MAX_TTL))
+    if redis_client:
+        with timed(REDIS_LATENCY, "redis", command="setex"):
+            redis_client.setex(cache_key, *encode_cache_entry(value, ttl))
+
+def encode_cache_entry(value, ttl, stale=True):
+    """Returns (hard TTL, encoded {v, t, s} envelope) for a SETEX of value with soft TTL ttl; stale=False drops the stale window."""
+    hard_ttl = ttl + min(ttl * (STALE_TTL_MULTIPLIER - 1), STALE_TTL_MAX) if stale else ttl
+    return int(hard_ttl), cache_codec.encode({"v": value, "t": time.time(), "s": ttl})
+
+# --- Request Coalescing (single-flight on cache misses) ---
+REDIS_SINGLE_FLIGHT = os.getenv('REDIS_SINGLE_FLIGHT', '0') == '1' # also coalesce across worker processes
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_LOCK_TIMEOUT', 90)) # longest a loader may hold the Redis lock
+SINGLE_FLIGHT_WAIT = float(os.getenv('SINGLE_FLIGHT_WAIT', 60)) # how long followers in other workers wait for it
+SINGLE_FLIGHT_POLL_INTERVAL = 0.1
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key so only one caller runs the loader."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, loader):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader: call = self._calls[key] = self._Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error: raise call.error
+            return call.result
+
+        try:
+            call.result = loader()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock: del self._calls[key]
+            call.done.set()
+        return call.result
+
+single_flight = SingleFlight()
+
+def _redis_single_flight(cache_key, loader):
+    """
+    Cross-worker variant: the worker holding 'lock:{cache_key}' runs the loader,
+    the others poll the cache for its result. If the lock is released without a
+    cached value (e.g. the leader got an error), the follower loads it itself.
+    """
+    lock = redis_client.lock(f"lock:{cache_key}", timeout=SINGLE_FLIGHT_LOCK_TIMEOUT)
+    if lock.acquire(blocking=False):
+        try:
+            if (cached_data := cache_get(cache_key)) is not None: return cached_data
+            return loader()
+        finally:
+            try: lock.release()
+            except redis.exceptions.LockError: log.warning("Single-flight lock for %s expired before release", cache_key)
+
+    log.debug("Waiting on another worker to load %s", cache_key)
+    deadline = time.monotonic() + SINGLE_FLIGHT_WAIT
+    while time.monotonic() < deadline:
+        if (cached_data := cache_get(cache_key)) is not None: return cached_data
+        if not lock.locked(): break
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+    return loader()
+
+def coalesced(cache_key, loader):
+    """Runs loader at most once at a time per cache_key and shares its result with concurrent callers."""
+    def lead():
+        if (cached_data := cache_get(cache_key)) is not None: return cached_data
+        if REDIS_SINGLE_FLIGHT and redis_client: return _redis_single_flight(cache_key, loader)
+        return loader()
+    return single_flight.do(cache_key, lead)
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def schedule_refresh(cache_key, loader):
+    """Queues one background reload of a stale key per process (and per deployment via Redis)."""
+    with _refreshing_lock:
+        if cache_key in _refreshing: return
+        _refreshing.add(cache_key)
+    refresh_marker = f"refresh:{cache_key}"
+    if not redis_client.set(refresh_marker, 1, nx=True, ex=REFRESH_LOCK_TIMEOUT):
+        with _refreshing_lock: _refreshing.discard(cache_key)
+        return
+
+    def run():
+        try:
+            log.info("Refreshing stale cache entry %s in the background", cache_key)
+            with priority("background"): single_flight.do(cache_key, loader)
+        except Exception as e:
+            log.warning("Background refresh failed for %s: %s", cache_key, e)
+        finally:
+            with _refreshing_lock: _refreshing.discard(cache_key)
+            redis_client.delete(refresh_marker)
+
+    refresh_executor.submit(run)
 
 # --- AI Developer Persona Generator ---
 def generate_developer_summary(profile_data, repos_data):
@@ -44,17 +517,23 @@ def generate_developer_summary(profile_data, repos_data):
     
     # Ensure profile_data is a dictionary before accessing 'login'
     if not isinstance(profile_data, dict):
-         print("Error: Invalid profile_data received in generate_developer_summary.")
+         log.warning("Error: Invalid profile_data received in generate_developer_summary.")
          return "Error: Internal server error (invalid profile data)."
          
     username = profile_data.get('login', 'unknown_user')
     cache_key = f"persona:{username}"
     
-    if cached_summary := redis_client.get(cache_key):
-        print(f"CACHE HIT for persona summary: {username}")
+    refresh = lambda: _generate_persona(username, profile_data, repos_data, cache_key)
+    if (cached_summary := cache_get(cache_key, refresh=refresh)) is not None:
+        log.info("CACHE HIT for persona summary: %s", username, extra=SAMPLED)
         return cached_summary
 
-    print(f"CACHE MISS for persona summary: {username}. Calling Gemini API.")
+    log.info("CACHE MISS for persona summary: %s. Calling Gemini API.", username)
+    return coalesced(cache_key, refresh)
+
+
+def _generate_persona(username, profile_data, repos_data, cache_key):
+    """Builds the persona prompt and calls Gemini; the cache-miss path of generate_developer_summary."""
 
     # Prepare input data for the prompt
     bio = profile_data.get('bio', 'No bio provided.')
@@ -84,21 +563,21 @@ def generate_developer_summary(profile_data, repos_data):
     if not api_key:
         return "Error: GEMINI_API_KEY is not configured."
 
-    gemini_api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={api_key}"
+    gemini_api_url = f"{GEMINI_API_URL}?key={api_key}"
     payload = {"contents": [{"parts": [{"text": prompt}]}]}
     max_retries = 3
     base_delay = 1
 
     for attempt in range(max_retries):
         try:
-            print(f"Attempt {attempt + 1} to call Gemini API for persona: {username}")
-            response = requests.post(gemini_api_url, json=payload, timeout=25)
+            log.debug("Attempt %s to call Gemini API for persona: %s", attempt + 1, username)
+            response = gemini_post(gemini_api_url, payload)
             
             if 500 <= response.status_code < 600:
-                print(f"Attempt {attempt + 1} (Persona): Server error {response.status_code}. Retrying...")
-                time.sleep(base_delay * (2 ** attempt)); continue
+                log.warning("Attempt %s (Persona): Server error %s. Retrying...", attempt + 1, response.status_code)
+                UPSTREAM_RETRIES.inc(service="gemini"); time.sleep(base_delay * (2 ** attempt)); continue
             if response.status_code == 400:
-                 print(f"Attempt {attempt + 1} (Persona): 400 Bad Request. Prompt likely issue. Error: {response.text}")
+                 log.warning("Attempt %s (Persona): 400 Bad Request. Prompt likely issue. Error: %s", attempt + 1, response.text)
                  return "Error: AI service rejected the persona request (Bad Request)."
             response.raise_for_status()
             result = response.json()
@@ -109,23 +588,23 @@ def generate_developer_summary(profile_data, repos_data):
                 if content and 'parts' in content and isinstance(content['parts'], list) and len(content['parts']) > 0:
                     summary = content['parts'][0].get('text')
                     if summary:
-                        print(f"Successfully generated persona for {username}")
-                        redis_client.setex(cache_key, PERSONA_CACHE_DURATION, summary) 
+                        log.info("Successfully generated persona for %s", username)
+                        cache_set(cache_key, summary, PERSONA_CACHE_DURATION) 
                         return summary
 
             finish_reason = candidates[0].get('finishReason', 'UNKNOWN') if candidates else 'NO_CANDIDATES'
             safety_ratings = candidates[0].get('safetyRatings', []) if candidates else []
-            print(f"Unexpected Gemini response (Persona) for {username}. Finish: {finish_reason}, Safety: {safety_ratings}.")
+            log.warning("Unexpected Gemini response (Persona) for %s. Finish: %s, Safety: %s.", username, finish_reason, safety_ratings)
             return f"AI model returned non-standard response (Persona: {finish_reason})."
 
         except requests.exceptions.Timeout:
-            print(f"Attempt {attempt + 1} (Persona): API call timed out. Retrying...")
+            log.warning("Attempt %s (Persona): API call timed out. Retrying...", attempt + 1)
             if attempt >= max_retries - 1: return f"Error: AI service timed out (Persona)."
-            time.sleep(base_delay * (2 ** attempt))
+            UPSTREAM_RETRIES.inc(service="gemini"); time.sleep(base_delay * (2 ** attempt))
         except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
-            print(f"Attempt {attempt + 1} (Persona): Network/JSON error ({e}). Retrying...")
+            log.warning("Attempt %s (Persona): Network/JSON error (%s). Retrying...", attempt + 1, e)
             if attempt >= max_retries - 1: return f"Error: Failed communication (Persona)."
-            time.sleep(base_delay * (2 ** attempt))
+            UPSTREAM_RETRIES.inc(service="gemini"); time.sleep(base_delay * (2 ** attempt))
 
     return f"Error: AI service unavailable (Persona) after {max_retries} attempts."
 
@@ -136,64 +615,136 @@ def get_ai_summary(owner, repo):
     Handles the entire AI summarization process: caching, fetching README,
     and calling the Gemini API with robust retry and error handling.
     """
-    print(f"--- Entering get_ai_summary for {owner}/{repo} ---") 
+    log.debug("Entering get_ai_summary for %s/%s", owner, repo)
     if not redis_client:
         return "Error: Redis connection not available."
 
     cache_key = f"summary:{owner}/{repo}"
-    if cached_summary := redis_client.get(cache_key):
-        print(f"CACHE HIT for summary: {owner}/{repo}")
+    refresh = lambda: _summarize_readme(owner, repo, cache_key)
+    if (cached_summary := cache_get(cache_key, refresh=refresh)) is not None:
+        log.info("CACHE HIT for summary: %s/%s", owner, repo, extra=SAMPLED)
         return cached_summary
 
-    print(f"CACHE MISS for summary: {owner}/{repo}. Processing...")
-    
-    # Step 1: Fetch README content using download_url
-    readme_content = None
-    readme_url = f"https://api.github.com/repos/{owner}/{repo}/readme"
-    token = os.getenv("GITHUB_TOKEN")
-    headers = {"Authorization": f"token {token}", "Accept": "application/vnd.github.v3+json"} if token else {"Accept": "application/vnd.github.v3+json"}
+    log.info("CACHE MISS for summary: %s/%s. Processing...", owner, repo)
+    return coalesced(cache_key, refresh)
+
+
+def _summarize_readme(owner, repo, cache_key):
+    """
+    The cache-miss path of get_ai_summary. Summaries are stored by content under
+    summary_blob:{digest of prompt version + truncated README}, with
+    readme:{owner}/{repo} pointing at the raw README ETag and digest last seen
+    (and the prompt version they were digested under).
+    The README is fetched in one streamed request, revalidated with that ETag; on
+    a 304 the stored summary is reused without downloading anything, and forks or
+    mirrors with identical READMEs share one Gemini call.
+    """
+    # Step 1: Fetch the raw README (or reuse the summary on a 304)
+    summary, readme = _read_readme(owner, repo, cache_key)
+    if readme is None: return summary
+
+    # Step 2: Look the summary up by content, calling Gemini only for new content
+    truncated_content, etag = readme
+    digest = readme_digest(truncated_content)
+    blob_key = f"summary_blob:{digest}"
+    summary = coalesced(blob_key, lambda: _gemini_readme_summary(f"{owner}/{repo}", truncated_content, blob_key))
+    _store_readme_summary(owner, repo, summary, digest, etag)
+    return summary
+
+def _read_readme(owner, repo, cache_key):
+    """
+    Fetches the raw README, revalidating with the ETag in readme:{owner}/{repo}.
+    Returns (summary, None) when a 304 lets the stored summary be reused or the
+    README can't be read (an 'Error: ...' summary), else (None, (truncated_content, etag)).
+    """
+    pointer_key = f"readme:{owner}/{repo}"
+    pointer = cache_get(pointer_key)
+    # A pointer digested under another prompt version can't vouch for the summary: fetch and re-digest.
+    etag = pointer.get("etag") if pointer and pointer.get("version") == SUMMARY_PROMPT_VERSION else None
     try:
-        readme_response = requests.get(readme_url, headers=headers, timeout=10) 
-        readme_response.raise_for_status() 
-        readme_data = readme_response.json()
-        download_url = readme_data.get('download_url')
-        if download_url:
-            content_response = requests.get(download_url, timeout=10) 
-            content_response.raise_for_status()
-            readme_content = content_response.content.decode('utf-8', errors='replace') 
-        else:
-            print(f"Could not find download_url in README response for {owner}/{repo}")
-            return "Error: Could not retrieve README download URL from GitHub."
-            
+        truncated_content, etag = fetch_readme_text(owner, repo, etag=etag)
+        if truncated_content is None:
+            if (summary := cache_get(f"summary_blob:{pointer['digest']}")) is not None:
+                log.info("README unchanged for %s/%s; reusing summary %s", owner, repo, pointer['digest'][:12])
+                cache_set(cache_key, summary, SUMMARY_CACHE_DURATION)
+                return summary, None
+            truncated_content, etag = fetch_readme_text(owner, repo) # summary expired; fetch the body again
+
     except requests.exceptions.Timeout:
-         print(f"Timeout fetching README for {owner}/{repo}")
-         return "Error: Timeout fetching README from GitHub."
+         log.warning("Timeout fetching README for %s/%s", owner, repo)
+         return "Error: Timeout fetching README from GitHub.", None
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 404:
-            print(f"README not found for {owner}/{repo}")
-            return "Error: This repository does not have a readable README file."
+            log.warning("README not found for %s/%s", owner, repo)
+            return "Error: This repository does not have a readable README file.", None
         else:
-            print(f"HTTP error fetching README for {owner}/{repo}: {e}")
-            return f"Error: Could not fetch README (HTTP {e.response.status_code})."
+            log.warning("HTTP error fetching README for %s/%s: %s", owner, repo, e)
+            return f"Error: Could not fetch README (HTTP {e.response.status_code}).", None
     except requests.exceptions.RequestException as e:
-        print(f"Network error fetching README for {owner}/{repo}: {e}")
-        return f"Error: Could not fetch README from GitHub due to network issue."
+        log.warning("Network error fetching README for %s/%s: %s", owner, repo, e)
+        return f"Error: Could not fetch README from GitHub due to network issue.", None
     except Exception as e: 
-        print(f"Unexpected error fetching README content for {owner}/{repo}: {e}")
-        return "Error: Failed to process README content."
+        log.error("Unexpected error fetching README content for %s/%s: %s", owner, repo, e)
+        return "Error: Failed to process README content.", None
 
-    if not readme_content:
-         return "Error: Failed to retrieve valid README content."
+    if not truncated_content:
+         return "Error: Failed to retrieve valid README content.", None
+    return None, (truncated_content, etag)
 
-    # Step 2: Call the Gemini API with retry logic
+def _store_readme_summary(owner, repo, summary, digest, etag):
+    """Caches a successful summary under summary:{owner}/{repo} and points readme:{owner}/{repo} at its content."""
+    if not summary.startswith("Error:") and not summary.startswith("AI model returned"):
+        cache_set_many({
+            f"summary:{owner}/{repo}": (summary, SUMMARY_CACHE_DURATION),
+            f"readme:{owner}/{repo}": ({"etag": etag, "digest": digest, "version": SUMMARY_PROMPT_VERSION}, VALIDATOR_CACHE_DURATION),
+        })
+
+
+# --- Content-addressed README Summaries ---
+SUMMARY_PROMPT_VERSION = "readme-v1" # bump whenever SUMMARY_PROMPT or SUMMARY_BATCH_PROMPT changes to retire old summaries
+SUMMARY_PROMPT = "Summarize this README file in 3-4 concise bullet points for a technical recruiter. Focus on the project's purpose, its main features, and the technology stack used. README content:\n\n{content}"
+SUMMARY_BATCH_PROMPT = "Summarize each README file below in 3-4 concise bullet points for a technical recruiter. Focus on the project's purpose, its main features, and the technology stack used. Reply with a JSON object that maps each README id to its summary as one string.\n\n{readmes}"
+SUMMARY_BATCH_SIZE = int(os.getenv('SUMMARY_BATCH_SIZE', 3)) # READMEs packed into one Gemini request; 1 disables batching
+README_MAX_LENGTH = 15000
+README_CHUNK_SIZE = 8192 # bytes read per step of a streamed README body
+
+def readme_digest(truncated_content):
+    """Content address of a summary: SHA-256 over the prompt version and the truncated README."""
+    return hashlib.sha256(f"{SUMMARY_PROMPT_VERSION}\n{truncated_content}".encode("utf-8")).hexdigest()
+
+def fetch_readme_text(owner, repo, etag=None, max_length=README_MAX_LENGTH):
+    """
+    Fetches a README in a single request as GitHub's raw media type, streaming and
+    decoding the body incrementally and closing the connection as soon as more than
+    max_length characters are in hand. Returns (text, etag): text is cut to
+    max_length (plus '...' when longer), or None on a 304 for the given etag.
+    """
+    request_headers = {"Accept": "application/vnd.github.raw"}
+    if etag: request_headers["If-None-Match"] = etag
+    response = github_request("GET", f"{GITHUB_API_URL}/repos/{owner}/{repo}/readme", headers=request_headers, stream=True, timeout=10)
+    with response:
+        if response.status_code == 304: return None, etag
+        response.raise_for_status()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        parts, length = [], 0
+        with timed(UPSTREAM_LATENCY, "github_raw", service="github_raw", status=response.status_code):
+            for chunk in response.iter_content(chunk_size=README_CHUNK_SIZE):
+                parts.append(decoder.decode(chunk))
+                length += len(parts[-1])
+                if length > max_length: break # the prompt budget is full; skip the rest of the body
+            else:
+                parts.append(decoder.decode(b"", final=True))
+        content = "".join(parts)
+        return content[:max_length] + ("..." if len(content) > max_length else ""), response.headers.get("ETag")
+
+def _gemini_readme_summary(label, truncated_content, blob_key):
+    """Calls Gemini with retries and caches a successful summary under blob_key."""
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         return "Error: GEMINI_API_KEY is not configured on the server."
 
-    gemini_api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={api_key}"
-    max_readme_length = 15000 
-    truncated_content = readme_content[:max_readme_length] + ("..." if len(readme_content) > max_readme_length else "")
-    prompt = f"Summarize this README file in 3-4 concise bullet points for a technical recruiter. Focus on the project's purpose, its main features, and the technology stack used. README content:\n\n{truncated_content}"
+    gemini_api_url = f"{GEMINI_API_URL}?key={api_key}"
+    prompt = SUMMARY_PROMPT.format(content=truncated_content)
     payload = {"contents": [{"parts": [{"text": prompt}]}]}
     
     max_retries = 3
@@ -201,16 +752,16 @@ def get_ai_summary(owner, repo):
 
     for attempt in range(max_retries):
         try:
-            print(f"Attempt {attempt + 1} to call Gemini API for {owner}/{repo}")
-            response = requests.post(gemini_api_url, json=payload, timeout=25) 
+            log.debug("Attempt %s to call Gemini API for %s", attempt + 1, label)
+            response = gemini_post(gemini_api_url, payload) 
             
             if 500 <= response.status_code < 600:
-                print(f"Attempt {attempt + 1}: Received server error {response.status_code}. Retrying...")
-                time.sleep(base_delay * (2 ** attempt))
+                log.warning("Attempt %s: Received server error %s. Retrying...", attempt + 1, response.status_code)
+                UPSTREAM_RETRIES.inc(service="gemini"); time.sleep(base_delay * (2 ** attempt))
                 continue
 
             if response.status_code == 400:
-                 print(f"Attempt {attempt + 1}: Received 400 Bad Request from Gemini. Content might be invalid/too long? Error: {response.text}")
+                 log.warning("Attempt %s: Received 400 Bad Request from Gemini. Content might be invalid/too long? Error: %s", attempt + 1, response.text)
                  return "Error: AI service rejected the request (Bad Request). Content might be invalid or too long."
 
             response.raise_for_status() 
@@ -222,35 +773,181 @@ def get_ai_summary(owner, repo):
                 if content and 'parts' in content and isinstance(content['parts'], list) and len(content['parts']) > 0:
                     summary = content['parts'][0].get('text')
                     if summary:
-                        print(f"Successfully generated summary for {owner}/{repo}")
-                        redis_client.setex(cache_key, SUMMARY_CACHE_DURATION, summary) 
+                        log.info("Successfully generated summary for %s", label)
+                        cache_set(blob_key, summary, SUMMARY_CONTENT_CACHE_DURATION) 
                         return summary 
 
             finish_reason = candidates[0].get('finishReason', 'UNKNOWN') if candidates else 'NO_CANDIDATES'
             safety_ratings = candidates[0].get('safetyRatings', []) if candidates else []
-            print(f"Unexpected Gemini API response structure for {owner}/{repo}. Finish Reason: {finish_reason}, Safety: {safety_ratings}. Response: {result}")
+            log.warning("Unexpected Gemini API response structure for %s. Finish Reason: %s, Safety: %s. Response: %s", label, finish_reason, safety_ratings, result)
             return f"AI model returned a non-standard response (Finish Reason: {finish_reason})."
 
         except requests.exceptions.Timeout:
-            print(f"Attempt {attempt + 1}: Gemini API call timed out for {owner}/{repo}. Retrying...")
+            log.warning("Attempt %s: Gemini API call timed out for %s. Retrying...", attempt + 1, label)
             if attempt >= max_retries - 1:
                  return f"Error: AI service timed out after {max_retries} attempts."
-            time.sleep(base_delay * (2 ** attempt))
+            UPSTREAM_RETRIES.inc(service="gemini"); time.sleep(base_delay * (2 ** attempt))
         except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
-            print(f"Attempt {attempt + 1}: Network or JSON error calling Gemini ({e}). Retrying...")
+            log.warning("Attempt %s: Network or JSON error calling Gemini (%s). Retrying...", attempt + 1, e)
             if attempt >= max_retries - 1:
                 return f"Error: Failed to communicate with the AI service after {max_retries} attempts."
-            time.sleep(base_delay * (2 ** attempt))
+            UPSTREAM_RETRIES.inc(service="gemini"); time.sleep(base_delay * (2 ** attempt))
 
     return f"Error: AI service is unavailable after {max_retries} attempts."
 
 
+def _gemini_readme_summaries(contents):
+    """
+    Summarizes several READMEs ({digest: truncated_content}) in one JSON-mode Gemini
+    request and caches each summary under summary_blob:{digest}. Returns
+    {digest: summary} for the summaries the reply contained; a failed call returns
+    {} so callers fall back to one request per README.
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key or not contents: return {}
+    ids = {f"r{i}": digest for i, digest in enumerate(contents)}
+    readmes = "\n\n".join(f"--- README {readme_id} ---\n{contents[digest]}" for readme_id, digest in ids.items())
+    payload = {
+        "contents": [{"parts": [{"text": SUMMARY_BATCH_PROMPT.format(readmes=readmes)}]}],
+        "generationConfig": {"responseMimeType": "application/json"},
+    }
+    try:
+        response = gemini_post(f"{GEMINI_API_URL}?key={api_key}", payload)
+        response.raise_for_status()
+        text = response.json()["candidates"][0]["content"]["parts"][0]["text"]
+        replies = json.loads(text)
+    except (requests.exceptions.RequestException, ValueError, KeyError, IndexError, TypeError) as e:
+        log.warning("Batched Gemini summary of %s READMEs failed (%s). Falling back to single requests.", len(contents), e)
+        return {}
+    if not isinstance(replies, dict): return {}
+
+    summaries = {ids[readme_id]: summary for readme_id, summary in replies.items()
+                 if readme_id in ids and isinstance(summary, str) and summary.strip()}
+    cache_set_many({f"summary_blob:{digest}": (summary, SUMMARY_CONTENT_CACHE_DURATION) for digest, summary in summaries.items()})
+    log.info("Generated %s of %s summaries in one batched Gemini request", len(summaries), len(contents))
+    return summaries
+
+def summarize_readmes(repos, batch_size=SUMMARY_BATCH_SIZE):
+    """
+    Summarizes many (owner, repo) READMEs with as few Gemini calls as possible and
+    caches each under summary:{owner}/{repo}. READMEs are fetched concurrently,
+    summaries already stored for their content are reused, and the rest are packed
+    batch_size per JSON-mode request; anything a batch misses gets its own request.
+    Returns {(owner, repo): summary}.
+    """
+    results, readmes = {}, {}
+    futures = {submit_in_context(fetch_executor, _read_readme, owner, repo, f"summary:{owner}/{repo}"): (owner, repo)
+               for owner, repo in dict.fromkeys(repos)}
+    for future, key in futures.items(): # in request order, so batches are deterministic
+        summary, readme = future.result()
+        if readme is None: results[key] = summary
+        else: readmes[key] = (readme_digest(readme[0]), *readme)
+
+    # Identical READMEs (forks, mirrors) share one slot in the batch.
+    stored = cache_get_many([f"summary_blob:{digest}" for digest, _, _ in readmes.values()])
+    pending = {digest: content for digest, content, _ in readmes.values() if f"summary_blob:{digest}" not in stored}
+    generated = {}
+    if batch_size > 1:
+        digests = list(pending)
+        for start in range(0, len(digests), batch_size):
+            generated.update(_gemini_readme_summaries({digest: pending[digest] for digest in digests[start:start + batch_size]}))
+
+    for (owner, repo), (digest, content, etag) in readmes.items():
+        blob_key = f"summary_blob:{digest}"
+        summary = stored.get(blob_key) or generated.get(digest) \
+            or coalesced(blob_key, lambda: _gemini_readme_summary(f"{owner}/{repo}", content, blob_key))
+        _store_readme_summary(owner, repo, summary, digest, etag)
+        results[(owner, repo)] = summary
+    return results
+
+
+# --- Pinned README Prefetch ---
+# Freshly loaded pinned repos get their summaries generated in the background, so a
+# click on one is almost always served from cache.
+SUMMARY_PREFETCH = os.getenv('SUMMARY_PREFETCH', '1') == '1'
+SUMMARY_PREFETCH_WORKERS = int(os.getenv('SUMMARY_PREFETCH_WORKERS', 2)) # prefetch batches running at once
+SUMMARY_PREFETCH_BACKLOG = int(os.getenv('SUMMARY_PREFETCH_BACKLOG', 32)) # queued batches beyond which prefetches are dropped
+SUMMARY_PREFETCH_LOCK_TIMEOUT = 300 # seconds a repo stays claimed by one process's prefetch
+
+summary_prefetch_executor = ThreadPoolExecutor(max_workers=SUMMARY_PREFETCH_WORKERS, thread_name_prefix="gitglance-prefetch")
+_prefetch_slots = threading.BoundedSemaphore(SUMMARY_PREFETCH_BACKLOG)
+
+def prefetch_readme_summaries(repos):
+    """
+    Queues background summaries for the given repo dicts whose summary:{owner}/{repo}
+    isn't cached, batch by batch on the bounded prefetch pool. Returns at once: the
+    cache check and the Redis claims (which stop other processes and page loads
+    repeating the work) run on the refresh pool, off the page-load path.
+    """
+    if not SUMMARY_PREFETCH or not redis_client or not os.getenv("GEMINI_API_KEY"): return
+    names = list(dict.fromkeys(
+        ((repo.get("owner") or {}).get("login"), repo.get("name")) for repo in repos or [] if isinstance(repo, dict)
+    ))
+    names = [(owner, repo) for owner, repo in names if owner and repo]
+    if not names: return
+    try: refresh_executor.submit(_claim_summary_prefetch, names)
+    except RuntimeError as e: log.debug("Summary prefetch skipped for %s: %s", names, e) # pool shut down at exit
+
+def _claim_summary_prefetch(names):
+    """Claims the uncached (owner, repo) pairs in one pipeline and submits them in batches; returns the number queued."""
+    cached = cache_get_many([f"summary:{owner}/{repo}" for owner, repo in names])
+    uncached = [(owner, repo) for owner, repo in names if f"summary:{owner}/{repo}" not in cached]
+    if not uncached: return 0
+    pipe = redis_client.pipeline(transaction=False)
+    for owner, repo in uncached: pipe.set(f"prefetch:{owner}/{repo}", 1, nx=True, ex=SUMMARY_PREFETCH_LOCK_TIMEOUT)
+    with timed(REDIS_LATENCY, "redis", command="pipeline_set"): claims = pipe.execute()
+    claimed = [name for name, won in zip(uncached, claims) if won]
+
+    queued = 0
+    for start in range(0, len(claimed), SUMMARY_BATCH_SIZE):
+        batch = claimed[start:start + SUMMARY_BATCH_SIZE]
+        if not _prefetch_slots.acquire(blocking=False):
+            log.info("Summary prefetch backlog is full; dropping %s repos", len(claimed) - start)
+            redis_client.delete(*[f"prefetch:{owner}/{repo}" for owner, repo in claimed[start:]])
+            break
+        summary_prefetch_executor.submit(_run_summary_prefetch, batch)
+        queued += len(batch)
+    return queued
+
+def _run_summary_prefetch(batch):
+    try:
+        with priority("background"): summarize_readmes(batch)
+    except RuntimeError as e: # the fetch pool is gone at interpreter shutdown
+        log.debug("Summary prefetch skipped for %s: %s", batch, e)
+    except Exception as e:
+        log.warning("Summary prefetch failed for %s: %s", batch, e)
+    finally:
+        _prefetch_slots.release()
+        redis_client.delete(*[f"prefetch:{owner}/{repo}" for owner, repo in batch])
+
+
+# --- GraphQL Repository Formatting ---
+def format_graphql_repo(repo):
+    """Normalizes a GraphQL Repository node into the REST-style dict the UI expects."""
+    owner_info = repo.get("owner", {})
+    owner_login = owner_info.get("login") if isinstance(owner_info, dict) else None
+    return {
+        "name": repo.get("name"),
+        "description": repo.get("description"),
+        "stargazers_count": repo.get("stargazerCount"),
+        "forks_count": repo.get("forkCount"),
+        "html_url": repo.get("url"),
+        "owner": {"login": owner_login }, 
+        "language": (repo.get("primaryLanguage") or {}).get("name"),
+        "topics": [
+            node['topic']['name'] 
+            for node in (repo.get("repositoryTopics") or {}).get("nodes", []) 
+            if node and isinstance(node, dict) and 'topic' in node and isinstance(node['topic'], dict) and 'name' in node['topic']
+        ] 
+    }
+
+
 # --- FINAL, DEBUGGED Pinned Repos ---
 def fetch_pinned_repos(username):
     """Fetches pinned repos using GraphQL, handles User/Org, includes detailed logging."""
-    print(f"--- DEBUG: Inside fetch_pinned_repos for {username} ---")
+    log.debug("Inside fetch_pinned_repos for %s", username)
     if not redis_client: 
-        print("--- DEBUG: Exiting fetch_pinned_repos early (no Redis) ---")
+        log.debug("Exiting fetch_pinned_repos early (no Redis)")
         return []
         
     cache_key = f"pinned:{username}"
@@ -260,117 +957,190 @@ def fetch_pinned_repos(username):
     # try: redis_client.delete(cache_key)
     # except Exception as e: print(f"--- DEBUG: Error clearing cache key {cache_key}: {e} ---")
     
-    if cached_data := redis_client.get(cache_key): 
-        print(f"--- DEBUG: Cache HIT for pinned repos: {username} ---")
-        try: 
-             parsed_data = json.loads(cached_data)
-             # print(f"--- DEBUG: Parsed cached data: {parsed_data}") # Keep commented unless deep debugging needed
-             return parsed_data
-        except json.JSONDecodeError as e:
-             print(f"--- DEBUG: ERROR parsing cached pinned data for {cache_key}: {e} ---")
-             redis_client.delete(cache_key); # Delete corrupted cache and fetch fresh
-
-    print(f"--- DEBUG: Cache MISS for pinned repos: {username}. Calling GraphQL... ---")
-    token = os.getenv("GITHUB_TOKEN")
-    
-    if not token:
-        print("--- DEBUG: GITHUB_TOKEN is MISSING for GraphQL! ---")
-        return []
-    print(f"--- DEBUG: Using GitHub Token for Pinned Repos: {token[:10]}... ---")
+    refresh = lambda: _fetch_pinned_repos_graphql(username, cache_key)
+    if (cached_data := cache_get(cache_key, refresh=refresh)) is not None: 
+        log.info("Cache HIT for pinned repos: %s", username, extra=SAMPLED)
+        return cached_data
+
+    log.info("Cache MISS for pinned repos: %s. Calling GraphQL...", username)
+    return coalesced(cache_key, refresh)
+
 
-    headers = {"Authorization": f"bearer {token}"}
-    graphql_query = { "query": """
+PINNED_REPOS_QUERY = """
         query($username: String!) {
           repositoryOwner(login: $username) {
             ... on User { pinnedItems(first: 6, types: REPOSITORY) { nodes { ... on Repository { name description stargazerCount forkCount url owner { login } repositoryTopics(first: 5) { nodes { topic { name } } } primaryLanguage { name } } } } }
             ... on Organization { pinnedItems(first: 6, types: REPOSITORY) { nodes { ... on Repository { name description stargazerCount forkCount url owner { login } repositoryTopics(first: 5) { nodes { topic { name } } } primaryLanguage { name } } } } }
           }
         }
-        """, "variables": {"username": username} }
+        """
+
+def _fetch_pinned_repos_graphql(username, cache_key):
+    """Runs the pinned-items GraphQL query; the cache-miss path of fetch_pinned_repos."""
+    if not github_tokens():
+        log.warning("GITHUB_TOKEN is MISSING for GraphQL!")
+        return []
+
+    graphql_query = {"query": PINNED_REPOS_QUERY, "variables": {"username": username}}
         
-    api_url = "https://api.github.com/graphql"
+    api_url = GITHUB_GRAPHQL_URL
     try:
-        response = requests.post(api_url, headers=headers, json=graphql_query, timeout=15) 
+        response = github_request("POST", api_url, resource="graphql", json=graphql_query, timeout=15) 
         response.raise_for_status() 
         raw_data = response.json()
         
         if "errors" in raw_data:
-             print(f"--- DEBUG: GraphQL API returned errors for {username}: {json.dumps(raw_data['errors'], indent=2)} ---")
+             log.warning("GraphQL API returned errors for %s: %s", username, raw_data['errors'])
              return [] 
 
         # print(f"--- DEBUG: Raw GraphQL Response (No Errors) for {username}: {json.dumps(raw_data, indent=2)} ---") # Keep commented unless deep debugging needed
 
         owner_data = raw_data.get("data", {}).get("repositoryOwner", {})
         if not owner_data:
-             print(f"--- DEBUG: No repositoryOwner data found in GraphQL response for {username}. Returning empty list. ---")
+             log.debug("No repositoryOwner data found in GraphQL response for %s. Returning empty list.", username)
              return [] 
 
         pinned_items = owner_data.get("pinnedItems", {}).get("nodes", None) 
         if pinned_items is None: 
-             print(f"--- DEBUG: pinnedItems.nodes was null in GraphQL response for {username}. Returning empty list. ---")
+             log.warning("pinnedItems.nodes was null in GraphQL response for %s. Returning empty list.", username)
              return []
         
         if not isinstance(pinned_items, list):
-             print(f"--- DEBUG: pinnedItems.nodes was not a list ({type(pinned_items)}). Returning empty list. ---")
+             log.warning("pinnedItems.nodes was not a list (%s). Returning empty list.", type(pinned_items))
              return []
 
-        print(f"--- DEBUG: Found {len(pinned_items)} pinned items for {username}. Processing... ---")
+        log.debug("Found %s pinned items for %s. Processing...", len(pinned_items), username)
         formatted_repos = []
         for repo in pinned_items:
             if not repo or not isinstance(repo, dict): 
-                print(f"--- DEBUG: Skipping invalid repo item: {repo} ---")
+                log.debug("Skipping invalid repo item: %s", repo)
                 continue
-            owner_info = repo.get("owner", {})
-            owner_login = owner_info.get("login") if isinstance(owner_info, dict) else None
-                
-            formatted_repos.append({
-                "name": repo.get("name"),
-                "description": repo.get("description"),
-                "stargazers_count": repo.get("stargazerCount"),
-                "forks_count": repo.get("forkCount"),
-                "html_url": repo.get("url"),
-                "owner": {"login": owner_login }, 
-                "language": (repo.get("primaryLanguage") or {}).get("name"),
-                "topics": [
-                    node['topic']['name'] 
-                    for node in repo.get("repositoryTopics", {}).get("nodes", []) 
-                    if node and isinstance(node, dict) and 'topic' in node and isinstance(node['topic'], dict) and 'name' in node['topic']
-                ] 
-            })
+            formatted_repos.append(format_graphql_repo(repo))
         
-        print(f"--- DEBUG: Successfully formatted {len(formatted_repos)} pinned repos for {username}. Caching... ---")
-        redis_client.setex(cache_key, PINNED_CACHE_DURATION, json.dumps(formatted_repos)) 
+        log.debug("Successfully formatted %s pinned repos for %s. Caching...", len(formatted_repos), username)
+        cache_set(cache_key, formatted_repos, PINNED_CACHE_DURATION) 
+        prefetch_readme_summaries(formatted_repos)
         return formatted_repos
         
     except requests.exceptions.Timeout:
-        print(f"--- DEBUG: Timeout calling GraphQL API for {username}. Returning empty list. ---")
+        log.warning("Timeout calling GraphQL API for %s. Returning empty list.", username)
         return [] 
     except requests.exceptions.RequestException as e:
-        print(f"--- DEBUG: Error calling GraphQL API for {username}: {e} ---")
+        log.warning("Error calling GraphQL API for %s: %s", username, e)
         if e.response: 
-            print(f"--- DEBUG: Response Status Code: {e.response.status_code} ---")
-            print(f"--- DEBUG: Response Text: {e.response.text} ---")
+            log.debug("Response Status Code: %s", e.response.status_code)
+            log.debug("Response Text: %s", e.response.text)
         return [] 
     except json.JSONDecodeError as e:
-        print(f"--- DEBUG: Error decoding JSON response from GraphQL for {username}: {e} ---")
+        log.warning("Error decoding JSON response from GraphQL for %s: %s", username, e)
         return []
     except Exception as e: 
-         print(f"--- DEBUG: Unexpected error processing GraphQL response for {username}: {e} ---")
+         log.error("Unexpected error processing GraphQL response for %s: %s", username, e)
          return []
 
 
+# --- Payload Projection (only the fields the UI and analysis use) ---
+PROFILE_FIELDS = (
+    "login", "id", "type", "name", "bio", "company", "location", "blog", "twitter_username",
+    "avatar_url", "html_url", "followers", "following", "public_repos", "created_at",
+)
+REPO_FIELDS = (
+    "name", "full_name", "description", "html_url", "language", "topics", "stargazers_count",
+    "forks_count", "fork", "pushed_at", "created_at", "updated_at",
+)
+
+def slim_profile(profile):
+    """Strips a REST user payload down to PROFILE_FIELDS."""
+    if not isinstance(profile, dict): return profile
+    return {field: profile.get(field) for field in PROFILE_FIELDS if field in profile}
+
+def slim_repo(repo):
+    """Strips a REST repo payload down to REPO_FIELDS plus the owner's login."""
+    if not isinstance(repo, dict): return repo
+    slim = {field: repo.get(field) for field in REPO_FIELDS if field in repo}
+    slim["owner"] = {"login": (repo.get("owner") or {}).get("login")}
+    return slim
+
+def slim_repos(repos):
+    return [slim_repo(repo) for repo in repos] if isinstance(repos, list) else repos
+
+# --- Conditional GitHub GET (ETag / Last-Modified revalidation) ---
+def _conditional_github_get(cache_key, api_url, ttl, project=None):
+    """
+    GETs a GitHub REST resource and caches it under cache_key for ttl seconds.
+    The body and its ETag/Last-Modified are also kept under 'etag:{cache_key}'
+    for VALIDATOR_CACHE_DURATION, so once the short cache expires we revalidate
+    with If-None-Match instead of re-downloading. A 304 is served from the stored
+    body and does not count against GitHub's rate limit. If given, project is
+    applied to the body before anything is cached.
+    """
+    validator_key = f"etag:{cache_key}"
+    stored = None
+    if cached_validator := redis_client.get(validator_key):
+        if (stored := decode_validator(cached_validator)) is None: redis_client.delete(validator_key)
+
+    response = github_request("GET", api_url, headers=validator_headers(stored), timeout=10)
+    if response.status_code == 304 and stored:
+        log.debug("Revalidated %s with 304 Not Modified", cache_key)
+        cache_set(cache_key, stored["data"], ttl)
+        redis_client.expire(validator_key, VALIDATOR_CACHE_DURATION)
+        return stored["data"]
+    response.raise_for_status()
+
+    data = response.json()
+    if project: data = project(data)
+    cache_set(cache_key, data, ttl)
+    if (validator := encode_validator(response.headers, data)) is not None:
+        redis_client.setex(validator_key, VALIDATOR_CACHE_DURATION, validator)
+    return data
+
+# The validator helpers do no I/O, so asgi.py's async fetchers share them.
+def decode_validator(cached_validator):
+    """Decodes a stored etag:{cache_key} entry; None if it is unreadable."""
+    try: return cache_codec.decode(cached_validator)
+    except (ValueError, zlib.error): return None
+
+def validator_headers(stored):
+    """Conditional request headers for a stored validator (empty without one)."""
+    request_headers = {}
+    if stored:
+        if stored.get("etag"): request_headers["If-None-Match"] = stored["etag"]
+        if stored.get("last_modified"): request_headers["If-Modified-Since"] = stored["last_modified"]
+    return request_headers
+
+def encode_validator(response_headers, data):
+    """Encodes the body with the response's ETag/Last-Modified for etag:{cache_key}, or None if GitHub sent neither."""
+    etag, last_modified = response_headers.get("ETag"), response_headers.get("Last-Modified")
+    if not (etag or last_modified): return None
+    return cache_codec.encode({"etag": etag, "last_modified": last_modified, "data": data})
+
 # --- fetch_github_data (Final) ---
 def fetch_github_data(username):
     if not redis_client: return None
     cache_key = f"user:{username}"
-    if cached_data := redis_client.get(cache_key): return json.loads(cached_data)
-    token = os.getenv("GITHUB_TOKEN"); headers = {"Authorization": f"token {token}"} if token else {}
-    api_url = f"https://api.github.com/users/{username}"
+    refresh = lambda: _load_github_data(username, cache_key)
+    if (cached_data := cache_get(cache_key, refresh=refresh)) is not None: return cached_data
+    if cache_get(f"missing:{username}"): return None
+    return coalesced(cache_key, refresh)
+
+def _load_github_data(username, cache_key):
+    api_url = f"{GITHUB_API_URL}/users/{username}"
     try:
-        response = requests.get(api_url, headers=headers, timeout=10); response.raise_for_status() 
-        user_data = response.json(); redis_client.setex(cache_key, CACHE_DURATION, json.dumps(user_data)); return user_data
-    except requests.exceptions.Timeout: print(f"Timeout user data for {username}"); return None
-    except requests.exceptions.RequestException as e: print(f"Error user data for {username}: {e}"); return None
+        return _conditional_github_get(cache_key, api_url, CACHE_DURATION, project=slim_profile)
+    except requests.exceptions.Timeout: log.warning("Timeout user data for %s", username); return None
+    except requests.exceptions.RequestException as e:
+        if e.response is not None and e.response.status_code == 404: remember_missing_user(username)
+        log.warning("Error user data for %s: %s", username, e); return None
+
+def remember_missing_user(username):
+    """
+    Negative-caches a login GitHub reported as not found under missing:{username}.
+    The entry has no stale window, so the login is looked up again after
+    NOT_FOUND_CACHE_DURATION.
+    """
+    cache_key = f"missing:{username}"
+    local_cache.set(cache_key, True, min(NOT_FOUND_CACHE_DURATION, LOCAL_CACHE_MAX_TTL))
+    if redis_client: redis_client.setex(cache_key, *encode_cache_entry(True, NOT_FOUND_CACHE_DURATION, stale=False))
 
 # --- fetch_user_repos (Final) ---
 def fetch_user_repos(username, page=1):
@@ -378,16 +1148,87 @@ def fetch_user_repos(username, page=1):
     cache_key = f"repos:{username}"; 
     # Only cache the first page 
     if page == 1:
-        if cached_data := redis_client.get(cache_key): return json.loads(cached_data)
-    token = os.getenv("GITHUB_TOKEN"); headers = {"Authorization": f"token {token}"} if token else {}
-    api_url = f"https://api.github.com/users/{username}/repos?sort=pushed&per_page=30&page={page}"
+        refresh = lambda: _load_user_repos(username, page, cache_key)
+        if (cached_data := cache_get(cache_key, refresh=refresh)) is not None: return cached_data
+        return coalesced(cache_key, refresh)
+    return _load_user_repos(username, page, cache_key)
+
+def _load_user_repos(username, page, cache_key):
+    api_url = f"{GITHUB_API_URL}/users/{username}/repos?sort=pushed&per_page=30&page={page}"
     try:
-        response = requests.get(api_url, headers=headers, timeout=10); response.raise_for_status() 
-        repos_data = response.json(); 
-        if page == 1: redis_client.setex(cache_key, CACHE_DURATION, json.dumps(repos_data))
-        return repos_data
-    except requests.exceptions.Timeout: print(f"Timeout repos page {page} for {username}"); return []
-    except requests.exceptions.RequestException as e: print(f"Error repos page {page} for {username}: {e}"); return []
+        if page == 1: return _conditional_github_get(cache_key, api_url, CACHE_DURATION, project=slim_repos)
+        response = github_request("GET", api_url, timeout=10); response.raise_for_status() 
+        return slim_repos(response.json())
+    except requests.exceptions.Timeout: log.warning("Timeout repos page %s for %s", page, username); return []
+    except requests.exceptions.RequestException as e: log.warning("Error repos page %s for %s: %s", page, username, e); return []
+
+# --- iter_all_user_repos (Full pagination, streamed page by page) ---
+ALL_REPOS_PER_PAGE = 100
+ALL_REPOS_MAX_PAGES = int(os.getenv('ALL_REPOS_MAX_PAGES', 50)) # 5,000 repos
+ALL_REPOS_CONCURRENCY = int(os.getenv('ALL_REPOS_CONCURRENCY', 6)) # pages in flight at once
+
+def _fetch_repo_page(username, page):
+    """Fetches one 100-repo page; returns (slim repos, last page number from the Link header or None)."""
+    api_url = f"{GITHUB_API_URL}/users/{username}/repos?sort=pushed&per_page={ALL_REPOS_PER_PAGE}&page={page}"
+    response = github_request("GET", api_url, timeout=10); response.raise_for_status()
+    last_url = response.links.get("last", {}).get("url")
+    last_page = int(parse_qs(urlparse(last_url).query)["page"][0]) if last_url else None
+    return slim_repos(response.json()), last_page
+
+def iter_all_user_repos(username):
+    """
+    Yields (page, repos) for every page of a user's repos, as soon as each page is
+    available. Pages are cached as separate chunks ('repos_all:{username}:{page}')
+    with a 'repos_all:{username}:meta' entry recording the page count, so cached
+    walks also stream chunk by chunk. After page 1 reveals the last page, the rest
+    are fetched concurrently and may arrive out of order. Pages that failed, and
+    pages past ALL_REPOS_MAX_PAGES, are yielded as (page, None) so callers can
+    tell a partial walk from a complete one. Raises
+    requests.exceptions.RequestException if page 1 itself fails.
+    """
+    meta_key = f"repos_all:{username}:meta"
+    # A walk past its soft TTL is redone rather than replayed, so new pushes and repos show up
+    # (and language-byte refreshes built on this list see them).
+    freshness = cache_freshness([meta_key])[meta_key]
+    if freshness and freshness[0] > 0 and (meta := cache_get(meta_key)) is not None:
+        for page in range(1, meta["pages"] + 1):
+            chunk = cache_get(f"repos_all:{username}:{page}")
+            if chunk is None: # evicted chunk: refetch just this page
+                chunk, _ = _fetch_repo_page(username, page)
+                cache_set(f"repos_all:{username}:{page}", chunk, CACHE_DURATION)
+            yield page, chunk
+        for page in range(meta["pages"] + 1, meta.get("total_pages", meta["pages"]) + 1): yield page, None
+        return
+
+    first_page, total_pages = _fetch_repo_page(username, 1)
+    cache_set(f"repos_all:{username}:1", first_page, CACHE_DURATION)
+    yield 1, first_page
+    total_pages = total_pages or 1
+    last_page = min(total_pages, ALL_REPOS_MAX_PAGES)
+    if total_pages > last_page:
+        log.warning("Full walk for %s stops at page %s of %s (ALL_REPOS_MAX_PAGES)", username, last_page, total_pages)
+
+    pending_pages = list(range(2, last_page + 1))
+    in_flight = {}
+    fetched_all = True
+    while pending_pages or in_flight:
+        while pending_pages and len(in_flight) < ALL_REPOS_CONCURRENCY:
+            page = pending_pages.pop(0)
+            in_flight[submit_in_context(fetch_executor, _fetch_repo_page, username, page)] = page
+        future = next(as_completed(in_flight))
+        page = in_flight.pop(future)
+        try:
+            chunk, _ = future.result()
+        except requests.exceptions.RequestException as e:
+            log.warning("Error repos page %s of full walk for %s: %s", page, username, e)
+            fetched_all = False
+            yield page, None
+            continue
+        cache_set(f"repos_all:{username}:{page}", chunk, CACHE_DURATION)
+        yield page, chunk
+
+    for page in range(last_page + 1, total_pages + 1): yield page, None
+    if fetched_all: cache_set(meta_key, {"pages": last_page, "total_pages": total_pages}, CACHE_DURATION)
 
 # --- analyze_repo_languages (Final) ---
 def analyze_repo_languages(repos):
@@ -395,35 +1236,464 @@ def analyze_repo_languages(repos):
     languages = [repo['language'] for repo in repos if repo and isinstance(repo, dict) and repo.get('language') is not None]
     return Counter(languages)
 
+# --- Byte-weighted Language Stats ---
+# langs:{owner}/{repo} holds one repo's GitHub-linguist byte breakdown together with
+# the pushed_at it was measured at, so a repo is only re-fetched after a new push.
+LANGUAGE_CACHE_DURATION = int(os.getenv('LANGUAGE_CACHE_DURATION', 2592000)) # 30 days; pushed_at invalidates sooner
+LANGUAGE_BATCH_SIZE = int(os.getenv('LANGUAGE_BATCH_SIZE', 50)) # repos per aliased GraphQL query
+LANGUAGES_PER_REPO = 20
+
+def _repo_languages_query(count):
+    """Builds a query with one aliased repository(owner:, name:) lookup per repo: r0, r1, ..."""
+    variables = ", ".join(f"$o{i}: String!, $n{i}: String!" for i in range(count))
+    lookups = " ".join(
+        f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ languages(first: {LANGUAGES_PER_REPO}, orderBy: {{field: SIZE, direction: DESC}}) {{ edges {{ size node {{ name }} }} }} }}"
+        for i in range(count))
+    return f"query({variables}) {{ {lookups} }}"
+
+def _load_repo_languages(repos):
+    """
+    Fetches byte breakdowns for up to LANGUAGE_BATCH_SIZE repos in one GraphQL query and
+    caches each under langs:{full_name}. Returns {full_name: {language: bytes}}; repos
+    the query couldn't resolve are left out.
+    """
+    variables = {}
+    for i, repo in enumerate(repos):
+        variables[f"o{i}"], variables[f"n{i}"] = repo["full_name"].split("/", 1)
+    payload = {"query": _repo_languages_query(len(repos)), "variables": variables}
+    try:
+        response = github_request("POST", GITHUB_GRAPHQL_URL, resource="graphql", json=payload, timeout=15)
+        response.raise_for_status()
+        data = response.json().get("data") or {}
+    except requests.exceptions.RequestException as e: log.warning("Error fetching repo languages: %s", e); return {}
+    except json.JSONDecodeError as e: log.warning("Error decoding repo languages: %s", e); return {}
+
+    breakdowns, entries = {}, {}
+    for i, repo in enumerate(repos):
+        if not (node := data.get(f"r{i}")): continue
+        edges = (node.get("languages") or {}).get("edges") or []
+        breakdowns[repo["full_name"]] = {edge["node"]["name"]: edge["size"] for edge in edges if edge and edge.get("node")}
+        entries[f"langs:{repo['full_name']}"] = ({"pushed_at": repo.get("pushed_at"), "bytes": breakdowns[repo["full_name"]]}, LANGUAGE_CACHE_DURATION)
+    if entries: cache_set_many(entries)
+    return breakdowns
+
+def fetch_language_bytes(username):
+    """
+    Returns {"language_bytes": [[language, bytes], ...], "repos_counted": n} summed
+    over all of the user's non-fork repos, largest first, or None when it can't be
+    computed (no token, user lookup failed).
+    """
+    if not redis_client or not github_tokens(): return None
+    cache_key = f"languages:{username}"
+    refresh = lambda: _compute_language_bytes(username, cache_key)
+    if (cached_stats := cache_get(cache_key, refresh=refresh)) is not None: return cached_stats
+    return coalesced(cache_key, refresh)
+
+def _compute_language_bytes(username, cache_key):
+    """Reads every repo's cached breakdown with one MGET and re-fetches only those pushed since."""
+    repos, walk_failed = [], False
+    try:
+        for page, chunk in iter_all_user_repos(username):
+            if chunk is None: # pages past the cap are as far as any walk gets; failed ones are not
+                walk_failed = walk_failed or page <= ALL_REPOS_MAX_PAGES; continue
+            repos.extend(repo for repo in chunk if repo.get("full_name") and not repo.get("fork"))
+    except requests.exceptions.RequestException as e:
+        log.warning("Error listing repos for language stats of %s: %s", username, e)
+        return None
+
+    cached = cache_get_many([f"langs:{repo['full_name']}" for repo in repos])
+    breakdowns, stale = {}, []
+    for repo in repos:
+        entry = cached.get(f"langs:{repo['full_name']}")
+        if entry and entry.get("pushed_at") == repo.get("pushed_at"): breakdowns[repo["full_name"]] = entry["bytes"]
+        else: stale.append(repo)
+
+    chunks = [stale[i:i + LANGUAGE_BATCH_SIZE] for i in range(0, len(stale), LANGUAGE_BATCH_SIZE)]
+    futures = [submit_in_context(fetch_executor, _load_repo_languages, chunk) for chunk in chunks]
+    done, _ = wait(futures, timeout=PROFILE_FETCH_DEADLINE) # one deadline for all chunks, not one each
+    for future in futures:
+        if future not in done: log.warning("Repo language chunk for %s exceeded the deadline.", username); continue
+        try: breakdowns.update(future.result())
+        except Exception as e: log.error("Unexpected error fetching repo languages for %s: %s", username, e)
+
+    totals = Counter()
+    for languages in breakdowns.values(): totals.update(languages)
+    stats = {"language_bytes": totals.most_common(), "repos_counted": len(breakdowns)}
+    if len(breakdowns) == len(repos) and not walk_failed: cache_set(cache_key, stats, CACHE_DURATION) # don't pin a partial total
+    return stats
+
 # --- calculate_activity_streak (Final) ---
 def calculate_activity_streak(username):
     if not redis_client: return 0
     cache_key = f"streak:{username}"
-    if cached_streak := redis_client.get(cache_key): return int(cached_streak)
-    token = os.getenv("GITHUB_TOKEN"); headers = {"Authorization": f"token {token}"} if token else {}
-    api_url = f"https://api.github.com/users/{username}/events?per_page=100"
-    active_dates = set()
-    for page in range(1, 4): 
+    refresh = lambda: _compute_activity_streak(username, cache_key)
+    if (cached_streak := cache_get(cache_key, refresh=refresh)) is not None: return int(cached_streak)
+    return int(coalesced(cache_key, refresh))
+
+# --- Incremental Activity Index ---
+# activity:{username} is a sorted set of active days (score = date ordinal) that
+# outlives GitHub's 300-event window; activity_meta:{username} remembers the newest
+# event id seen, the events ETag and the running streak so each refresh only
+# processes new events.
+ACTIVITY_EVENT_TYPES = ('PushEvent', 'CreateEvent', 'PullRequestEvent', 'IssuesEvent')
+ACTIVITY_INDEX_TTL = int(os.getenv('ACTIVITY_INDEX_TTL', 7776000)) # 90 days after the last refresh
+ACTIVITY_MAX_PAGES = 3 # GitHub only serves the latest 300 events
+
+def longest_streak(day_ordinals):
+    """Longest run of consecutive days in an iterable of date ordinals."""
+    longest = current = 0; previous = None
+    for day in sorted(set(day_ordinals)):
+        current = current + 1 if previous is not None and day == previous + 1 else 1
+        longest = max(longest, current); previous = day
+    return longest
+
+def extend_streak(meta, new_days):
+    """
+    Folds newly seen active days (ordinals) into meta's running streak. Returns
+    False if a day predates meta['last_day'], in which case the caller must
+    recompute from the full index.
+    """
+    for day in sorted(set(new_days)):
+        last_day = meta.get("last_day")
+        if last_day is not None and day < last_day: return False
+        if day == last_day: continue
+        meta["current"] = meta.get("current", 0) + 1 if last_day is not None and day == last_day + 1 else 1
+        meta["longest"] = max(meta.get("longest", 0), meta["current"])
+        meta["last_day"] = day
+    return True
+
+def _fetch_new_activity_days(username, meta):
+    """
+    Returns ordinals of active days from events newer than meta['last_event_id'].
+    meta's ETag and last event id only advance once the walk reaches events already
+    seen (or the end of the feed), so a page that fails mid-walk is retried next time.
+    """
+    api_url = f"{GITHUB_API_URL}/users/{username}/events?per_page=100"
+    last_event_id = meta.get("last_event_id", 0)
+    new_days = set(); newest_event_id = last_event_id; etag = meta.get("etag")
+    for page in range(1, ACTIVITY_MAX_PAGES + 1):
+        request_headers = {"If-None-Match": meta["etag"]} if page == 1 and meta.get("etag") else {}
         try:
-            response = requests.get(f"{api_url}&page={page}", headers=headers, timeout=10); response.raise_for_status() 
-            events = response.json(); 
-            if not events: break
-            for event in events:
-                if event.get('type') in ['PushEvent', 'CreateEvent', 'PullRequestEvent', 'IssuesEvent']:
-                    created_at = event.get('created_at')
-                    if created_at:
-                        try: event_date = datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ").date(); active_dates.add(event_date)
-                        except (ValueError, TypeError): print(f"Warning: Could not parse date {created_at} in event for {username}")
-        except requests.exceptions.Timeout: print(f"Timeout events page {page} for {username}"); break 
-        except requests.exceptions.RequestException as e: print(f"Error events page {page} for {username}: {e}"); break 
-    if not active_dates: redis_client.setex(cache_key, STREAK_CACHE_DURATION, 0); return 0
-    sorted_dates = sorted(list(active_dates), reverse=True); longest_streak = 0; current_streak = 0
-    if sorted_dates: 
-        longest_streak = 1; current_streak = 1
-        for i in range(len(sorted_dates) - 1):
-            if sorted_dates[i] - sorted_dates[i+1] == timedelta(days=1): current_streak += 1
-            else:
-                if sorted_dates[i] - sorted_dates[i+1] > timedelta(days=1): longest_streak = max(longest_streak, current_streak); current_streak = 1 
-        longest_streak = max(longest_streak, current_streak) 
-    redis_client.setex(cache_key, STREAK_CACHE_DURATION, longest_streak); return longest_streak
+            response = github_request("GET", f"{api_url}&page={page}", headers=request_headers, timeout=10)
+            if response.status_code == 304: return new_days # nothing new since the last refresh
+            response.raise_for_status()
+            if page == 1: etag = response.headers.get("ETag")
+            events = response.json()
+        except requests.exceptions.Timeout: log.warning("Timeout events page %s for %s", page, username); return new_days
+        except requests.exceptions.RequestException as e: log.warning("Error events page %s for %s: %s", page, username, e); return new_days
+        if not events: break
+
+        reached_seen_event = False
+        for event in events:
+            try: event_id = int(event.get('id'))
+            except (TypeError, ValueError): continue
+            if event_id <= last_event_id: reached_seen_event = True; break
+            newest_event_id = max(newest_event_id, event_id)
+            if event.get('type') in ACTIVITY_EVENT_TYPES and (created_at := event.get('created_at')):
+                try: new_days.add(datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ").date().toordinal())
+                except (ValueError, TypeError): log.warning("Could not parse date %s in event for %s", created_at, username)
+        if reached_seen_event or len(events) < 100: break
+    meta["etag"], meta["last_event_id"] = etag, newest_event_id
+    return new_days
+
+def _compute_activity_streak(username, cache_key):
+    index_key, meta_key = f"activity:{username}", f"activity_meta:{username}"
+    meta = {}
+    if stored_meta := redis_client.get(meta_key):
+        try: meta = cache_codec.decode(stored_meta)
+        except (ValueError, zlib.error): log.warning("Rebuilding undecodable activity meta for %s", username)
+
+    new_days = _fetch_new_activity_days(username, meta)
+    pipe = redis_client.pipeline()
+    if new_days:
+        pipe.zadd(index_key, {date.fromordinal(day).isoformat(): day for day in new_days})
+    if not extend_streak(meta, new_days):
+        # Backfilled an older day: recompute the run lengths from the whole index.
+        pipe.execute(); pipe = redis_client.pipeline()
+        all_days = {int(score) for _, score in redis_client.zrange(index_key, 0, -1, withscores=True)}
+        meta["longest"] = longest_streak(all_days)
+        meta["last_day"] = max(all_days)
+        meta["current"] = 1
+        while meta["last_day"] - meta["current"] in all_days: meta["current"] += 1
+    pipe.setex(meta_key, ACTIVITY_INDEX_TTL, cache_codec.encode(meta))
+    pipe.expire(index_key, ACTIVITY_INDEX_TTL)
+    pipe.execute()
+
+    longest = meta.get("longest", 0)
+    cache_set(cache_key, longest, STREAK_CACHE_DURATION); return longest
+
+# --- reload_user_entry (Forced refresh, used by the cache warmer) ---
+USER_CACHE_FAMILIES = ("user", "repos", "pinned", "streak", "persona")
+
+def reload_user_entry(family, username):
+    """
+    Reloads one of a user's cache entries from upstream regardless of its age,
+    sharing the call with any concurrent miss for the same key. Returns the
+    loader's result (None/[]/'Error: ...' on failure, as the fetchers do).
+    """
+    return single_flight.do(f"{family}:{username}", user_entry_loader(family, username))
+
+def user_entry_loader(family, username):
+    """The zero-argument upstream loader behind {family}:{username}, without coalescing; used as a stale-entry refresher."""
+    cache_key = f"{family}:{username}"
+    def load_persona():
+        profile_data = fetch_github_data(username)
+        if not profile_data: return f"Error: User '{username}' not found for persona generation."
+        return _generate_persona(username, profile_data, fetch_user_repos(username, page=1), cache_key)
+
+    loaders = {
+        "user": lambda: _load_github_data(username, cache_key),
+        "repos": lambda: _load_user_repos(username, 1, cache_key),
+        "pinned": lambda: _fetch_pinned_repos_graphql(username, cache_key),
+        "streak": lambda: _compute_activity_streak(username, cache_key),
+        "persona": load_persona,
+    }
+    return loaders[family]
+
+# --- fetch_profile_graphql (Combined profile + repos + pinned query) ---
+GRAPHQL_BATCH_SIZE = int(os.getenv('GRAPHQL_BATCH_SIZE', 10)) # users per aliased multi-user query
+PROFILE_GRAPHQL_FRAGMENTS = """
+    fragment UserFields on User {
+      login databaseId name bio company location websiteUrl twitterUsername avatarUrl url createdAt
+      followers { totalCount }
+      following { totalCount }
+      repositories(ownerAffiliations: OWNER, privacy: PUBLIC) { totalCount }
+      recentRepos: repositories(first: 30, ownerAffiliations: OWNER, privacy: PUBLIC, orderBy: {field: PUSHED_AT, direction: DESC}) {
+        nodes { ...RepoFields nameWithOwner isFork pushedAt createdAt updatedAt }
+      }
+      pinnedItems(first: 6, types: REPOSITORY) { nodes { ... on Repository { ...RepoFields } } }
+    }
+    fragment OrgFields on Organization {
+      login databaseId name description location websiteUrl twitterUsername avatarUrl url createdAt
+      repositories(privacy: PUBLIC) { totalCount }
+      recentRepos: repositories(first: 30, privacy: PUBLIC, orderBy: {field: PUSHED_AT, direction: DESC}) {
+        nodes { ...RepoFields nameWithOwner isFork pushedAt createdAt updatedAt }
+      }
+      pinnedItems(first: 6, types: REPOSITORY) { nodes { ... on Repository { ...RepoFields } } }
+    }
+    fragment RepoFields on Repository {
+      name description stargazerCount forkCount url owner { login }
+      repositoryTopics(first: 10) { nodes { topic { name } } } primaryLanguage { name }
+    }
+    """
+
+def _profiles_graphql_query(count):
+    """Builds a query with one aliased repositoryOwner(login:) lookup (user or organization) per username: u0, u1, ..."""
+    variables = ", ".join(f"$u{i}: String!" for i in range(count))
+    lookups = " ".join(f"u{i}: repositoryOwner(login: $u{i}) {{ __typename ...UserFields ...OrgFields }}" for i in range(count))
+    return f"query({variables}) {{ {lookups} }}" + PROFILE_GRAPHQL_FRAGMENTS
+
+def _normalize_graphql_user(user):
+    """Maps the GraphQL user/organization node onto the fields of the REST /users/{username} payload."""
+    return {
+        "login": user.get("login"),
+        "id": user.get("databaseId"),
+        "type": "Organization" if user.get("__typename") == "Organization" else "User",
+        "name": user.get("name"),
+        "bio": user.get("bio") or user.get("description"),
+        "company": user.get("company"),
+        "location": user.get("location"),
+        "blog": user.get("websiteUrl") or "",
+        "twitter_username": user.get("twitterUsername"),
+        "avatar_url": user.get("avatarUrl"),
+        "html_url": user.get("url"),
+        "followers": (user.get("followers") or {}).get("totalCount", 0),
+        "following": (user.get("following") or {}).get("totalCount", 0),
+        "public_repos": (user.get("repositories") or {}).get("totalCount", 0),
+        "created_at": user.get("createdAt"),
+    }
+
+def fetch_profile_graphql(username):
+    """
+    Fetches profile, first 30 repos by push date and pinned repos in a single GraphQL
+    request and caches them under the usual user:/repos:/pinned: keys. Unknown logins
+    come back with a profile of None. Returns None when the combined query can't be
+    used (no token, errors) so the caller can fall back to the REST fetchers.
+    """
+    if not redis_client or not github_tokens(): return None
+    return coalesced(f"profile:{username}", lambda: _load_profiles_graphql([username]).get(username))
 
+def _load_profiles_graphql(usernames):
+    """
+    Runs one aliased GraphQL query for up to GRAPHQL_BATCH_SIZE users and caches each
+    result. Returns {username: bundle}; logins GitHub reports as NOT_FOUND get a bundle
+    with a profile of None (and are negative-cached), and users the query couldn't
+    resolve otherwise are left out so callers can fall back to REST for them.
+    """
+    payload = profiles_graphql_payload(usernames)
+    try:
+        response = github_request("POST", GITHUB_GRAPHQL_URL, resource="graphql", json=payload, timeout=15)
+        response.raise_for_status()
+        raw_data = response.json()
+    except requests.exceptions.RequestException as e: log.warning("Error combined GraphQL profiles for %s: %s", usernames, e); return {}
+    except json.JSONDecodeError as e: log.warning("Error decoding combined GraphQL profiles for %s: %s", usernames, e); return {}
+
+    found, not_found = parse_profiles_graphql(usernames, raw_data)
+    bundles = {}
+    for username in usernames:
+        if username in found:
+            bundles[username] = found[username]
+            cache_set_many(graphql_bundle_entries(username, found[username]))
+            prefetch_readme_summaries(found[username]["pinned"])
+        elif username in not_found:
+            remember_missing_user(username)
+            bundles[username] = {"profile": None, "repos": [], "pinned": []}
+    return bundles
+
+# profiles_graphql_payload/parse_profiles_graphql/graphql_bundle_entries do no I/O,
+# so asgi.py's async combined fetch shares them.
+def profiles_graphql_payload(usernames):
+    """The POST body of one aliased combined query for usernames."""
+    return {"query": _profiles_graphql_query(len(usernames)), "variables": {f"u{i}": name for i, name in enumerate(usernames)}}
+
+def parse_profiles_graphql(usernames, raw_data):
+    """
+    Splits a combined query's response into ({username: bundle}, {usernames GitHub
+    reported as NOT_FOUND}); users in neither could not be resolved and should fall
+    back to REST.
+    """
+    # Unknown logins resolve to null with a NOT_FOUND error for their alias.
+    data = raw_data.get("data") or {}
+    not_found_aliases = {(error.get("path") or [None])[0] for error in raw_data.get("errors") or [] if error.get("type") == "NOT_FOUND"}
+    found, not_found = {}, set()
+    for i, username in enumerate(usernames):
+        if user := data.get(f"u{i}"): found[username] = _graphql_user_bundle(user)
+        elif f"u{i}" in not_found_aliases: not_found.add(username)
+        else: log.info("Combined GraphQL profile unavailable for %s. Falling back to REST.", username)
+    return found, not_found
+
+def graphql_bundle_entries(username, bundle):
+    """The {cache_key: (value, ttl)} writes that cache a combined bundle under user:/repos:/pinned:."""
+    return {
+        f"user:{username}": (bundle["profile"], CACHE_DURATION),
+        f"repos:{username}": (bundle["repos"], CACHE_DURATION),
+        f"pinned:{username}": (bundle["pinned"], PINNED_CACHE_DURATION),
+    }
+
+def _graphql_user_bundle(user):
+    """Normalizes one GraphQL UserFields/OrgFields node into {profile, repos, pinned}."""
+    profile = _normalize_graphql_user(user)
+    repos = []
+    for repo in (user.get("recentRepos") or {}).get("nodes") or []:
+        if not repo or not isinstance(repo, dict): continue
+        formatted = format_graphql_repo(repo)
+        formatted.update({
+            "full_name": repo.get("nameWithOwner"),
+            "fork": repo.get("isFork"),
+            "pushed_at": repo.get("pushedAt"),
+            "created_at": repo.get("createdAt"),
+            "updated_at": repo.get("updatedAt"),
+        })
+        repos.append(formatted)
+    pinned = [format_graphql_repo(repo) for repo in (user.get("pinnedItems") or {}).get("nodes") or [] if repo and isinstance(repo, dict)]
+    return {"profile": profile, "repos": repos, "pinned": pinned}
+
+# --- fetch_profile_bundles (Bulk multi-user fetch) ---
+BATCH_MAX_USERS = int(os.getenv('BATCH_MAX_USERS', 100))
+BATCH_FALLBACK_CONCURRENCY = int(os.getenv('BATCH_FALLBACK_CONCURRENCY', 8)) # per-user REST fallbacks run at once
+# Fallbacks wait on fetch_executor themselves, so they get their own pool to avoid starving it.
+bundle_executor = ThreadPoolExecutor(max_workers=BATCH_FALLBACK_CONCURRENCY, thread_name_prefix="gitglance-bundle")
+
+def fetch_profile_bundles(usernames):
+    """
+    Returns {username: {"profile", "repos", "pinned"}} for many users. Cache hits are
+    resolved with one MGET, misses with aliased GraphQL queries in chunks of
+    GRAPHQL_BATCH_SIZE, and anything GraphQL can't resolve via the REST bundle.
+    A profile of None means the user wasn't found, unless "profile" is listed in
+    the bundle's 'timed_out' (legs a REST fallback dropped at its deadline).
+    """
+    usernames = list(dict.fromkeys(usernames))[:BATCH_MAX_USERS]
+    refreshers = {key: refresh for name in usernames for key, refresh in profile_refreshers(name).items()}
+    cached = cache_get_many(list(refreshers) + [f"missing:{name}" for name in usernames], refreshers=refreshers)
+
+    bundles, misses = {}, []
+    for name in usernames:
+        keys = (f"user:{name}", f"repos:{name}", f"pinned:{name}")
+        if all(key in cached for key in keys):
+            bundles[name] = {"profile": cached[keys[0]], "repos": cached[keys[1]], "pinned": cached[keys[2]], "timed_out": []}
+        elif f"missing:{name}" in cached:
+            bundles[name] = {"profile": None, "repos": [], "pinned": [], "timed_out": []}
+        else:
+            misses.append(name)
+
+    if misses and github_tokens() and redis_client and GRAPHQL_PROFILE_FETCH:
+        chunks = [misses[i:i + GRAPHQL_BATCH_SIZE] for i in range(0, len(misses), GRAPHQL_BATCH_SIZE)]
+        futures = [submit_in_context(fetch_executor, _load_profiles_graphql, chunk) for chunk in chunks]
+        done, _ = wait(futures, timeout=PROFILE_FETCH_DEADLINE) # one deadline for all chunks
+        for future in futures:
+            if future not in done: log.warning("Batch GraphQL profile chunk exceeded the deadline."); continue
+            try: bundles.update({name: {**bundle, "timed_out": []} for name, bundle in future.result().items()})
+            except Exception as e: log.error("Unexpected error in batch GraphQL profiles: %s", e)
+
+    # REST fallbacks run side by side, so each org or odd login doesn't add a full deadline.
+    fallbacks = {name: submit_in_context(bundle_executor, fetch_profile_bundle, name, PROFILE_FETCH_DEADLINE, False)
+                 for name in misses if name not in bundles}
+    for name, future in fallbacks.items():
+        try: fallback = future.result()
+        except Exception as e:
+            log.error("Unexpected error in REST profile fallback for %s: %s", name, e)
+            fallback = {"profile": None, "repos": [], "pinned": [], "timed_out": []}
+        bundles[name] = {"profile": fallback["profile"], "repos": fallback["repos"], "pinned": fallback["pinned"], "timed_out": fallback["timed_out"]}
+    return {name: bundles[name] for name in usernames}
+
+def profile_refreshers(username):
+    """Background reloaders for a user's user:/repos:/pinned: entries, keyed by cache key."""
+    return {f"{family}:{username}": user_entry_loader(family, username) for family in ("user", "repos", "pinned")}
+
+# --- fetch_profile_bundle (Concurrent page-1 fan-out) ---
+def fetch_profile_bundle(username, deadline=PROFILE_FETCH_DEADLINE, try_graphql=True):
+    """
+    Fetches the profile, first page of repos and pinned repos in parallel
+    under a single overall deadline. Legs that fail or miss the deadline
+    fall back to None/[] and are listed in 'timed_out' so the caller can
+    still render a partial dashboard.
+
+    All three cache keys are read with one MGET up front; only the legs that
+    missed are fetched. When any is uncached, a single combined GraphQL query is
+    tried first to fill all of them; the REST fan-out then covers what it missed.
+    Logins recently reported as not found (missing:{username}) return a None
+    profile without any upstream call.
+    """
+    started = time.monotonic()
+    legs = {
+        "profile": (f"user:{username}", fetch_github_data, (username,)),
+        "repos": (f"repos:{username}", fetch_user_repos, (username, 1)),
+        "pinned": (f"pinned:{username}", fetch_pinned_repos, (username,)),
+    }
+    cached = cache_get_many([key for key, _, _ in legs.values()] + [f"missing:{username}"], refreshers=profile_refreshers(username))
+    bundle = {"timed_out": []}
+    for name, (key, _, _) in legs.items():
+        if key in cached: bundle[name] = cached[key]
+    if len(bundle) == len(legs) + 1: return bundle
+    if f"missing:{username}" in cached:
+        return {"profile": None, "repos": [], "pinned": [], "timed_out": []}
+
+    if try_graphql and GRAPHQL_PROFILE_FETCH:
+        # GraphQL gets at most half the deadline, so a slow query still leaves time for the REST legs.
+        graphql_deadline = deadline / 2
+        try:
+            if combined := submit_in_context(fetch_executor, fetch_profile_graphql, username).result(timeout=graphql_deadline):
+                bundle.update(combined); return bundle
+        except FuturesTimeoutError: log.warning("Combined GraphQL profile for %s exceeded the %ss deadline.", username, graphql_deadline)
+        except Exception as e: log.error("Unexpected error in combined GraphQL profile for %s: %s", username, e)
+    deadline = max(deadline - (time.monotonic() - started), 0)
+
+    futures = {
+        name: submit_in_context(fetch_executor, fetch, *args)
+        for name, (_, fetch, args) in legs.items() if name not in bundle
+    }
+    defaults = {"profile": None, "repos": [], "pinned": []}
+    done, _ = wait(futures.values(), timeout=deadline)
+
+    for name, future in futures.items():
+        if future not in done:
+            log.warning("Deadline of %ss exceeded for %s of %s. Returning partial results.", deadline, name, username)
+            bundle["timed_out"].append(name)
+            bundle[name] = defaults[name]
+            continue
+        try:
+            bundle[name] = future.result()
+        except Exception as e:
+            log.error("Unexpected error fetching %s for %s: %s", name, username, e)
+            bundle[name] = defaults[name]
+    return bundle
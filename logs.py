@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# --- Logging Settings ---
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper() # DEBUG for the old verbose output; WARNING for quiet production
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text') # 'json' for one structured object per line
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 0.01)) # share of high-volume records (cache hits) that are kept
+
+# Pass as extra= on high-volume records so only LOG_SAMPLE_RATE of them are written.
+SAMPLED = {"sampled": True}
+
+
+class SamplingFilter(logging.Filter):
+    """Drops all but a random sample_rate share of records logged with extra=SAMPLED."""
+
+    def __init__(self, sample_rate):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        return not getattr(record, "sampled", False) or random.random() < self.sample_rate
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, thread, msg (and exc if any)."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info: entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# --- Queue-backed Handler ---
+# Request threads only put records on an in-memory queue; a single listener thread
+# formats them and does the blocking stdout write.
+class DeferredQueueHandler(QueueHandler):
+    """
+    Enqueues records untouched. QueueHandler.prepare() would format the message on the
+    logging thread and drop exc_info; here both are left to the listener's formatter.
+    Log arguments are therefore read later, so pass values rather than objects that change.
+    """
+
+    def prepare(self, record):
+        return record
+
+_listener = None
+_configure_lock = threading.Lock()
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, sample_rate=LOG_SAMPLE_RATE):
+    """Routes the 'gitglance' logger through a QueueHandler to stdout (once per process)."""
+    global _listener
+    with _configure_lock:
+        if _listener: return
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(sample_rate))
+
+        root = logging.getLogger("gitglance")
+        root.setLevel(level)
+        root.addHandler(queue_handler)
+        root.propagate = False
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop) # flush queued records on shutdown
+
+def get_logger(name):
+    """Returns the module logger 'gitglance.<name>', configuring logging on first use."""
+    configure_logging()
+    return logging.getLogger(f"gitglance.{name}")
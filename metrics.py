@@ -0,0 +1,123 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# --- Metric Types ---
+# In-process counters and histograms rendered in the Prometheus text format by
+# /metrics. Each worker process keeps its own values, as prometheus_client does
+# without multiprocess mode, so scrape every worker (or run one per container).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Counter:
+    """A monotonically increasing count per label set."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels.get(label, "")) for label in self.labelnames), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values per label set."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {} # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labelnames)
+        with self._lock:
+            series = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames + ('le',), key + (repr(bound),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames + ('le',), key + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+def _format_labels(names, values):
+    if not names: return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+REGISTRY = []
+
+def render_metrics():
+    """All registered metrics in the Prometheus text exposition format (0.0.4)."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# --- Metrics ---
+CACHE_REQUESTS = Counter("gitglance_cache_requests_total", "Cache lookups by key family and result (local_hit, hit, stale, miss).", ("family", "result"))
+UPSTREAM_LATENCY = Histogram("gitglance_upstream_request_seconds", "Latency of GitHub REST/GraphQL and Gemini calls.", ("service", "status"))
+UPSTREAM_RETRIES = Counter("gitglance_upstream_retries_total", "Upstream calls retried after a timeout or server error.", ("service",))
+REDIS_LATENCY = Histogram("gitglance_redis_command_seconds", "Latency of Redis cache commands.", ("command",), buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+HTTP_LATENCY = Histogram("gitglance_http_request_seconds", "Latency of requests served by the app, by route.", ("endpoint", "method", "status"))
+
+
+# --- Per-request Stage Timings ---
+# A request's trace is a dict of stage -> [total seconds, calls]. It lives in a
+# context variable, so work submitted with logic.submit_in_context still reports
+# into the request that started it.
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_trace_lock = threading.Lock()
+
+def start_trace():
+    """Begins collecting stage timings for the current request; returns the trace dict."""
+    trace = {}
+    _current_trace.set(trace)
+    return trace
+
+def record_stage(stage, seconds):
+    if (trace := _current_trace.get()) is None: return
+    with _trace_lock:
+        totals = trace.setdefault(stage, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+@contextmanager
+def timed(histogram, stage, **labels):
+    """
+    Times the block into histogram and the current request's trace. Labels may be
+    filled in from inside the block by updating the yielded dict (e.g. a status code).
+    """
+    started = time.perf_counter()
+    try: yield labels
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed, **labels)
+        record_stage(stage, elapsed)
+
+def server_timing_header(trace, total_seconds=None):
+    """Formats a trace as a Server-Timing header value (durations in milliseconds)."""
+    parts = [f'{stage};dur={seconds * 1000:.1f};desc="{calls} call{"s" if calls != 1 else ""}"' for stage, (seconds, calls) in sorted(trace.items())]
+    if total_seconds is not None: parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
@@ -59,4 +59,419 @@ def test_analyze_repo_languages_empty_list():
     
     # 3. ASSERT
     assert len(result) == 0
-    assert isinstance(result, Counter)
\ No newline at end of file
+    assert isinstance(result, Counter)
+
+def test_fetch_profile_bundle_returns_partial_results_on_deadline(monkeypatch):
+    """
+    Tests that a slow leg is dropped at the deadline while the fast legs are still returned.
+    """
+    # 1. ARRANGE
+    import time
+    import logic
+    monkeypatch.setattr(logic, 'fetch_github_data', lambda username: {'login': username})
+    monkeypatch.setattr(logic, 'fetch_user_repos', lambda username, page=1: [{'language': 'Python'}])
+    monkeypatch.setattr(logic, 'fetch_pinned_repos', lambda username: time.sleep(1) or [{'language': 'Go'}])
+
+    # 2. ACT
+    bundle = logic.fetch_profile_bundle('octocat', deadline=0.2)
+
+    # 3. ASSERT
+    assert bundle['profile'] == {'login': 'octocat'}
+    assert bundle['repos'] == [{'language': 'Python'}]
+    assert bundle['pinned'] == []
+    assert bundle['timed_out'] == ['pinned']
+
+
+def test_local_cache_evicts_least_recently_used_and_expired_entries(monkeypatch):
+    """
+    Tests that the in-process cache tier is size-bounded (LRU) and honors per-entry TTLs.
+    """
+    # 1. ARRANGE
+    import logic
+    now = [1000.0]
+    monkeypatch.setattr(logic.time, 'monotonic', lambda: now[0])
+    cache = logic.LocalCache(max_entries=2)
+    cache.set('user:a', {'login': 'a'}, ttl=60)
+    cache.set('user:b', {'login': 'b'}, ttl=10)
+
+    # 2. ACT
+    cache.get('user:a')  # touch 'a' so 'b' becomes least recently used
+    cache.set('user:c', {'login': 'c'}, ttl=5)
+    evicted = cache.get('user:b')
+    kept = cache.get('user:a')
+    now[0] += 6
+
+    # 3. ASSERT
+    assert evicted is None  # dropped by LRU
+    assert kept == {'login': 'a'}
+    assert cache.get('user:c') is None  # expired
+    assert cache.get('user:a') == {'login': 'a'}
+
+
+def test_single_flight_runs_loader_once_for_concurrent_callers():
+    """
+    Tests that concurrent misses on the same key share one loader call and its result.
+    """
+    # 1. ARRANGE
+    import threading
+    import time
+    import logic
+    flight = logic.SingleFlight()
+    calls = []
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'login': 'octocat'}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('user:octocat', loader))) for _ in range(5)]
+
+    # 2. ACT
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+    # 3. ASSERT
+    assert len(calls) == 1
+    assert results == [{'login': 'octocat'}] * 5
+
+
+def test_slim_repo_keeps_only_ui_fields():
+    """
+    Tests that cached repo payloads are projected down to the fields the dashboard uses.
+    """
+    # 1. ARRANGE
+    from logic import slim_repo
+    raw_repo = {
+        'name': 'git-glance', 'language': 'Python', 'stargazers_count': 3, 'topics': ['flask'],
+        'owner': {'login': 'octocat', 'avatar_url': 'https://example.com/a.png', 'gists_url': '...'},
+        'archive_url': 'https://api.github.com/...', 'node_id': 'R_kgDO', 'permissions': {'admin': False},
+    }
+
+    # 2. ACT
+    result = slim_repo(raw_repo)
+
+    # 3. ASSERT
+    assert result == {
+        'name': 'git-glance', 'language': 'Python', 'stargazers_count': 3, 'topics': ['flask'],
+        'owner': {'login': 'octocat'},
+    }
+
+
+def test_cache_codec_round_trips_and_compresses_large_values():
+    """
+    Tests that the cache codec round-trips values and only compresses bodies above the threshold.
+    """
+    # 1. ARRANGE
+    from logic import CacheCodec
+    codec = CacheCodec('json', compress_threshold=256)
+    small_value = {'login': 'octocat'}
+    large_value = [{'name': f'repo-{i}', 'language': 'Python', 'topics': ['flask', 'redis']} for i in range(50)]
+
+    # 2. ACT
+    small_encoded = codec.encode(small_value)
+    large_encoded = codec.encode(large_value)
+
+    # 3. ASSERT
+    assert small_encoded[1] & CacheCodec.FLAG_ZLIB == 0
+    assert large_encoded[1] & CacheCodec.FLAG_ZLIB
+    assert len(large_encoded) < len(str(large_value))
+    assert codec.decode(small_encoded) == small_value
+    assert codec.decode(large_encoded) == large_value
+    with pytest.raises(ValueError):
+        codec.decode(b'{"legacy": "plain json"}')
+
+
+def test_extend_streak_matches_full_recompute():
+    """
+    Tests that folding new active days into the running streak matches recomputing from scratch.
+    """
+    # 1. ARRANGE
+    from logic import extend_streak, longest_streak
+    first_batch = [1, 2, 4, 5, 6]
+    second_batch = [6, 7, 8, 9, 12]
+    meta = {}
+
+    # 2. ACT
+    extend_streak(meta, first_batch)
+    in_order = extend_streak(meta, second_batch)
+    out_of_order = extend_streak(dict(meta), [3])
+
+    # 3. ASSERT
+    assert in_order is True
+    assert meta['longest'] == longest_streak(first_batch + second_batch) == 6
+    assert meta['current'] == 1 and meta['last_day'] == 12
+    assert out_of_order is False  # caller falls back to a full recompute
+    assert longest_streak([]) == 0
+
+
+def test_histogram_renders_cumulative_buckets_and_server_timing():
+    """
+    Tests that histograms export cumulative Prometheus buckets and timed blocks land in the request trace.
+    """
+    # 1. ARRANGE
+    from metrics import Histogram, REGISTRY, start_trace, timed, server_timing_header
+    histogram = Histogram("test_latency_seconds", "Test latency.", ("service",), buckets=(0.1, 1.0))
+    REGISTRY.remove(histogram)
+    trace = start_trace()
+
+    # 2. ACT
+    histogram.observe(0.05, service="github")
+    histogram.observe(0.5, service="github")
+    with timed(histogram, "gemini", service="gemini") as labels:
+        labels["service"] = "gemini"
+    lines = histogram.render()
+
+    # 3. ASSERT
+    assert 'test_latency_seconds_bucket{service="github",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{service="github",le="1.0"} 2' in lines
+    assert 'test_latency_seconds_bucket{service="github",le="+Inf"} 2' in lines
+    assert 'test_latency_seconds_count{service="gemini"} 1' in lines
+    assert trace["gemini"][1] == 1
+    assert server_timing_header(trace).startswith('gemini;dur=')
+
+def test_fetch_readme_text_stops_reading_once_the_budget_is_filled(monkeypatch):
+    """
+    Tests that a streamed README is decoded across chunk boundaries and abandoned once max_length is exceeded.
+    """
+    # 1. ARRANGE
+    import logic
+    body = ("é" * 50).encode("utf-8") # 100 bytes; every 3-byte chunk splits a character
+    chunks_read = []
+    class FakeResponse:
+        status_code, headers = 200, {"ETag": '"abc"'}
+        def __enter__(self): return self
+        def __exit__(self, *exc_info): pass
+        def raise_for_status(self): pass
+        def iter_content(self, chunk_size):
+            for start in range(0, len(body), 3):
+                chunks_read.append(start)
+                yield body[start:start + 3]
+    monkeypatch.setattr(logic, 'github_request', lambda *args, **kwargs: FakeResponse())
+
+    # 2. ACT
+    text, etag = logic.fetch_readme_text('octocat', 'hello', max_length=10)
+    chunks_for_capped_read = len(chunks_read)
+    full_text, _ = logic.fetch_readme_text('octocat', 'hello', max_length=100)
+
+    # 3. ASSERT
+    assert text == "é" * 10 + "..."
+    assert etag == '"abc"'
+    assert chunks_for_capped_read == 8 # 11 characters (22 bytes) fill the budget; the other 26 chunks are never read
+    assert full_text == "é" * 50
+
+def test_summarize_readmes_packs_new_readmes_into_one_gemini_request(monkeypatch):
+    """
+    Tests that uncached READMEs share one batched Gemini call and identical READMEs share one slot in it.
+    """
+    # 1. ARRANGE
+    import json
+    import logic
+    readmes = {'api': '# API', 'api-fork': '# API', 'cli': '# CLI'}
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(logic, 'local_cache', logic.LocalCache(100))
+    monkeypatch.setattr(logic, '_read_readme', lambda owner, repo, cache_key: (None, (readmes[repo], f'"{repo}"')))
+    prompts = []
+    class FakeResponse:
+        def __init__(self, text): self.text = text
+        def raise_for_status(self): pass
+        def json(self): return {"candidates": [{"content": {"parts": [{"text": self.text}]}}]}
+    def fake_gemini_post(url, payload):
+        prompts.append(payload["contents"][0]["parts"][0]["text"])
+        return FakeResponse(json.dumps({"r0": "API summary", "r1": "CLI summary"}))
+    monkeypatch.setattr(logic, 'gemini_post', fake_gemini_post)
+
+    # 2. ACT
+    results = logic.summarize_readmes([('octocat', 'api'), ('octocat', 'api-fork'), ('octocat', 'cli')], batch_size=3)
+
+    # 3. ASSERT
+    assert len(prompts) == 1
+    assert prompts[0].count('--- README ') == 2
+    assert results == {('octocat', 'api'): 'API summary', ('octocat', 'api-fork'): 'API summary', ('octocat', 'cli'): 'CLI summary'}
+    assert logic.cache_get('summary:octocat/cli') == 'CLI summary'
+
+def test_fetch_profile_bundle_skips_upstream_for_recently_missing_users(monkeypatch):
+    """
+    Tests that a login negative-cached as missing short-circuits the bundle without any fetch.
+    """
+    # 1. ARRANGE
+    import logic
+    monkeypatch.setattr(logic, 'local_cache', logic.LocalCache(100))
+    calls = []
+    monkeypatch.setattr(logic, 'fetch_profile_graphql', lambda username: calls.append('graphql'))
+    monkeypatch.setattr(logic, 'fetch_github_data', lambda username: calls.append('profile'))
+    logic.remember_missing_user('ghost')
+
+    # 2. ACT
+    bundle = logic.fetch_profile_bundle('ghost')
+
+    # 3. ASSERT
+    assert bundle == {'profile': None, 'repos': [], 'pinned': [], 'timed_out': []}
+    assert calls == []
+
+def test_requeue_stalled_jobs_only_moves_jobs_without_a_lease(monkeypatch):
+    """
+    Tests that a job whose worker stopped heartbeating goes back on the queue while a leased one,
+    and one just taken but not yet leased, stay put.
+    """
+    # 1. ARRANGE
+    import fakeredis
+    import jobs
+    fake_redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(jobs, 'redis_client', fake_redis)
+    for job_id, status in (('taken', 'queued'), ('dead', 'running'), ('alive', 'running')):
+        jobs._save_job({"id": job_id, "kind": "summary", "args": ["o", job_id], "cache_key": f"summary:o/{job_id}", "status": status, "created_at": 0})
+        fake_redis.lpush(jobs.JOB_PROCESSING_KEY, job_id)
+    fake_redis.set("jobbeat:alive", 1, ex=jobs.JOB_LEASE)
+
+    # 2. ACT
+    requeued = jobs.requeue_stalled_jobs()
+
+    # 3. ASSERT
+    assert requeued == 1
+    assert fake_redis.lrange(jobs.JOB_QUEUE_KEY, 0, -1) == [b'dead']
+    assert fake_redis.lrange(jobs.JOB_PROCESSING_KEY, 0, -1) == [b'alive', b'taken']
+    assert jobs.get_job('dead')['status'] == 'queued'
+
+@pytest.fixture
+def governed_tokens(monkeypatch):
+    """Two GitHub tokens with their rate-limit state in a fresh fakeredis."""
+    import fakeredis
+    import logic
+    monkeypatch.setenv('GITHUB_TOKENS', 'token-a,token-b')
+    monkeypatch.setattr(logic, 'redis_client', fakeredis.FakeRedis())
+    def set_budget(token, remaining, resets_in):
+        logic.redis_client.hset(logic.rate_limiter.state_key('core', token), mapping={"remaining": remaining, "reset": int(logic.time.time() + resets_in)})
+    return set_budget
+
+def test_rate_limiter_picks_the_least_used_token_and_counts_it_in_flight(governed_tokens):
+    """
+    Tests that acquire() hands out the token with the most budget left and decrements it.
+    """
+    # 1. ARRANGE
+    import logic
+    governed_tokens('token-a', 100, 600)
+    governed_tokens('token-b', 4000, 600)
+
+    # 2. ACT
+    token = logic.rate_limiter.acquire('core')
+
+    # 3. ASSERT
+    assert token == 'token-b'
+    assert logic.redis_client.hget(logic.rate_limiter.state_key('core', 'token-b'), 'in_flight') == b'1'
+
+def test_rate_limiter_spreads_in_flight_calls_before_any_budget_is_recorded(governed_tokens):
+    """
+    Tests that on a cold start, with no rate-limit headers recorded yet, in-flight calls still spread across tokens.
+    """
+    # 1. ARRANGE
+    import logic
+
+    # 2. ACT
+    tokens = [logic.rate_limiter.acquire('core') for _ in range(4)]
+
+    # 3. ASSERT
+    assert sorted(tokens) == ['token-a', 'token-a', 'token-b', 'token-b']
+
+def test_rate_limiter_waits_briefly_but_raises_for_long_waits_and_background_calls(governed_tokens, monkeypatch):
+    """
+    Tests the reserve handling: short interactive waits sleep, long waits and background calls raise.
+    """
+    # 1. ARRANGE
+    import logic
+    slept = []
+    monkeypatch.setattr(logic.time, 'sleep', slept.append)
+    governed_tokens('token-a', 5, 2)
+    governed_tokens('token-b', 5, 2)
+
+    # 2. ACT
+    logic.rate_limiter.acquire('core')
+    with pytest.raises(logic.GitHubRateLimited), logic.priority('background'):
+        logic.rate_limiter.acquire('core')
+    governed_tokens('token-a', 5, 600)
+    governed_tokens('token-b', 5, 600)
+    with pytest.raises(logic.GitHubRateLimited):
+        logic.rate_limiter.acquire('core')
+
+    # 3. ASSERT
+    assert len(slept) == 1 and 0 < slept[0] <= 2
+
+def test_rate_limiter_reserves_background_budget_and_expires_unrecorded_state(governed_tokens):
+    """
+    Tests that background calls stop at their larger reserve and in-flight counts without headers get a TTL.
+    """
+    # 1. ARRANGE
+    import logic
+    governed_tokens('token-a', 400, 600)
+    governed_tokens('token-b', 400, 600)
+    fresh_key = logic.rate_limiter.state_key('graphql', 'token-a')
+
+    # 2. ACT
+    interactive_token = logic.rate_limiter.acquire('core')
+    with pytest.raises(logic.GitHubRateLimited), logic.priority('background'):
+        logic.rate_limiter.acquire('core')
+    logic.rate_limiter.acquire('graphql')
+
+    # 3. ASSERT
+    assert interactive_token in ('token-a', 'token-b')
+    assert 0 < logic.redis_client.ttl(fresh_key) <= logic.RATE_LIMIT_WINDOW
+
+def test_stale_cache_entry_is_served_and_refreshed_once_in_the_background(monkeypatch):
+    """
+    Tests that an entry past its soft TTL is still served, its loader runs once in the background, and the
+    rewritten entry's hard TTL is capped by STALE_TTL_MAX.
+    """
+    # 1. ARRANGE
+    import fakeredis
+    import logic
+    from concurrent.futures import ThreadPoolExecutor
+    monkeypatch.setattr(logic, 'redis_client', fakeredis.FakeRedis())
+    refresh_pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(logic, 'refresh_executor', refresh_pool)
+    monkeypatch.setattr(logic, 'STALE_TTL_MAX', 100)
+    stale_entry = logic.cache_codec.encode({"v": "old", "t": logic.time.time() - 120, "s": 60})
+    logic.redis_client.setex('user:stale-test', 300, stale_entry)
+    loads = []
+    def loader():
+        loads.append(1)
+        logic.cache_set('user:stale-test', 'new', 60)
+        return 'new'
+
+    # 2. ACT
+    first = logic.cache_get('user:stale-test', refresh=loader)
+    second = logic.cache_get('user:stale-test', refresh=loader)
+    refresh_pool.shutdown(wait=True)
+
+    # 3. ASSERT
+    assert first == 'old'
+    assert second in ('old', 'new') # the refresh may already have landed
+    assert loads == [1]
+    assert logic.cache_get('user:stale-test') == 'new'
+    assert 60 < logic.redis_client.ttl('user:stale-test') <= 160 # soft 60s + stale window capped at 100s
+
+def test_conditional_github_get_serves_304_from_the_stored_body(monkeypatch):
+    """
+    Tests that a stored ETag is sent as If-None-Match and a 304 is answered from the stored body,
+    re-caching it and extending the validator's TTL.
+    """
+    # 1. ARRANGE
+    import fakeredis
+    import logic
+    monkeypatch.setattr(logic, 'redis_client', fakeredis.FakeRedis())
+    validator = logic.cache_codec.encode({"etag": '"v1"', "last_modified": None, "data": {"login": "octocat"}})
+    logic.redis_client.setex('etag:user:octocat-304', 30, validator)
+    sent_headers = []
+    class FakeResponse:
+        status_code, headers = 304, {"ETag": '"v1"'}
+        def raise_for_status(self): raise AssertionError("a 304 with a stored body is not an error")
+    def fake_github_request(method, url, headers=None, **kwargs):
+        sent_headers.append(headers)
+        return FakeResponse()
+    monkeypatch.setattr(logic, 'github_request', fake_github_request)
+
+    # 2. ACT
+    data = logic._conditional_github_get('user:octocat-304', 'https://api.github.com/users/octocat', 60)
+
+    # 3. ASSERT
+    assert sent_headers == [{"If-None-Match": '"v1"'}]
+    assert data == {"login": "octocat"}
+    assert logic.cache_get('user:octocat-304') == {"login": "octocat"}
+    assert logic.redis_client.ttl('etag:user:octocat-304') > 30 # extended to VALIDATOR_CACHE_DURATION
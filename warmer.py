@@ -0,0 +1,122 @@
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv() # before importing logic, so tokens and REDIS_URL are visible to it
+
+from logic import (
+    redis_client,
+    cache_freshness,
+    reload_user_entry,
+    priority,
+    USER_CACHE_FAMILIES
+)
+from logs import get_logger
+
+log = get_logger("warmer")
+
+# --- Warmer Defaults ---
+WARMER_WORKERS = int(os.getenv('WARMER_WORKERS', 4))
+# Caps entries reloaded, not upstream requests: a user/repos/pinned reload is one GitHub
+# call, a streak reload up to a few event pages, a persona reload its GitHub reads plus
+# up to 3 Gemini attempts.
+WARMER_MAX_RELOADS = int(os.getenv('WARMER_MAX_RELOADS', 200)) # max entry reloads per cycle
+WARMER_INTERVAL = int(os.getenv('WARMER_INTERVAL', 300)) # seconds between cycles
+WARMER_LEAD = float(os.getenv('WARMER_LEAD', 0.2)) # refresh once less than this fraction of the soft TTL is left
+
+
+def plan_refreshes(usernames, families=USER_CACHE_FAMILIES, lead=WARMER_LEAD):
+    """
+    Returns (family, username) pairs whose entries are missing, stale or inside
+    the lead window, most urgent first. Missing entries sort first.
+    """
+    keys = [(family, name) for name in usernames for family in families]
+    freshness = cache_freshness([f"{family}:{name}" for family, name in keys])
+    due = []
+    for family, name in keys:
+        state = freshness[f"{family}:{name}"]
+        if state is None:
+            due.append((float("-inf"), family, name))
+        elif state[0] < state[1] * lead:
+            due.append((state[0], family, name))
+    return [(family, name) for _, family, name in sorted(due, key=lambda item: item[0])]
+
+
+def _reload(family, username):
+    """
+    Reloads one entry at background priority; returns True on success. The repos and
+    pinned loaders return [] on errors as well as for empty accounts, so success means
+    the entry was rewritten during the reload, not a particular result.
+    """
+    cache_key = f"{family}:{username}"
+    started = time.time()
+    with priority("background"):
+        try:
+            result = reload_user_entry(family, username)
+        except Exception as e:
+            log.error("Warmer: unexpected error reloading %s: %s", cache_key, e)
+            return False
+    state = cache_freshness([cache_key])[cache_key]
+    if state is None or state[0] < state[1] - (time.time() - started): # written before this reload began
+        log.warning("Warmer: could not reload %s (%s)", cache_key, result)
+        return False
+    return True
+
+
+def warm_once(usernames, executor, max_reloads=WARMER_MAX_RELOADS, lead=WARMER_LEAD):
+    """Runs one warming cycle and returns its stats."""
+    started = time.monotonic()
+    planned = plan_refreshes(usernames, lead=lead)
+    selected = planned[:max_reloads]
+    results = list(executor.map(lambda item: _reload(*item), selected))
+    elapsed = time.monotonic() - started
+    return {
+        "checked": len(usernames) * len(USER_CACHE_FAMILIES),
+        "due": len(planned),
+        "refreshed": sum(results),
+        "failed": len(results) - sum(results),
+        "deferred": len(planned) - len(selected),
+        "elapsed": elapsed,
+        "throughput": len(results) / elapsed if elapsed else 0.0,
+    }
+
+
+def _read_usernames(args):
+    usernames = list(args.usernames)
+    if args.file:
+        with open(args.file) as users_file:
+            usernames += [line.strip() for line in users_file if line.strip() and not line.startswith('#')]
+    return list(dict.fromkeys(usernames))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keeps GitGlance cache entries warm for a list of hot users.")
+    parser.add_argument("usernames", nargs="*", help="GitHub usernames to keep warm")
+    parser.add_argument("--file", help="file with one username per line")
+    parser.add_argument("--workers", type=int, default=WARMER_WORKERS, help="concurrent reloads")
+    parser.add_argument("--max-reloads", type=int, default=WARMER_MAX_RELOADS,
+                        help="max cache entries reloaded per cycle (one reload may make several upstream calls)")
+    parser.add_argument("--interval", type=int, default=WARMER_INTERVAL, help="seconds between cycles")
+    parser.add_argument("--lead", type=float, default=WARMER_LEAD, help="refresh when this fraction of the soft TTL remains")
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    args = parser.parse_args()
+
+    usernames = _read_usernames(args)
+    if not usernames: parser.error("no usernames given")
+    if not redis_client: parser.exit(1, "Warmer needs Redis to be available.\n")
+
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="gitglance-warmer") as executor:
+        while True:
+            stats = warm_once(usernames, executor, max_reloads=args.max_reloads, lead=args.lead)
+            log.info(
+                "Warmer: checked %s keys, %s due, refreshed %s, failed %s, deferred %s over the reload cap in %.1fs (%.2f reloads/s)",
+                stats['checked'], stats['due'], stats['refreshed'], stats['failed'], stats['deferred'], stats['elapsed'], stats['throughput']
+            )
+            if args.once: break
+            time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()